@@ -1,8 +1,100 @@
 from PIL import Image
 import os
 import glob
+import json
+import argparse
 
 
+ATLAS_MAX_SIZE = 2048
+
+
+def css_string(value):
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class AtlasWriter:
+    """把输出图标打包进少量图集大图，代替每个图标一个 PNG 文件
+
+    每个输出文件夹各自打包。图标按到达顺序以 first-fit 货架算法摆放：放入当前图集中第一个高度足够、
+    剩余宽度足够的货架，否则在下方新开一个货架；当前图集放不下时编码保存并开始下一张，
+    因此每张图集只编码一次，内存中同时只保留一张。close 时写入 atlas.json 与 atlas.css 坐标索引。
+    """
+
+    def __init__(self, max_size=ATLAS_MAX_SIZE, prefix='atlas'):
+        self.max_size = max_size
+        self.prefix = prefix
+        self.folders = {}
+
+    def add(self, output_path, img):
+        folder, name = os.path.split(output_path)
+        if img.width > self.max_size or img.height > self.max_size:
+            raise ValueError(f"图片尺寸 {img.width}x{img.height} 超过图集尺寸 {self.max_size}")
+        state = self.folders.setdefault(folder, {'sheets': [], 'icons': {}, 'sheet': None})
+        sheet, x, y = self.place(folder, state, img.size)
+        sheet['image'].paste(img if img.mode == 'RGBA' else img.convert('RGBA'), (x, y))
+        sheet['width'] = max(sheet['width'], x + img.width)
+        state['icons'][name] = {'sheet': len(state['sheets']), 'x': x, 'y': y,
+                                'width': img.width, 'height': img.height}
+
+    def place(self, folder, state, size):
+        width, height = size
+        sheet = state['sheet']
+        if sheet is not None:
+            for shelf in sheet['shelves']:
+                # shelf 为 [y, 高度, 已用宽度]
+                if height <= shelf[1] and shelf[2] + width <= self.max_size:
+                    shelf[2] += width
+                    return sheet, shelf[2] - width, shelf[0]
+            if sheet['bottom'] + height <= self.max_size:
+                sheet['shelves'].append([sheet['bottom'], height, width])
+                sheet['bottom'] += height
+                return sheet, 0, sheet['bottom'] - height
+            self.flush(folder, state)
+        sheet = state['sheet'] = {
+            'image': Image.new('RGBA', (self.max_size, self.max_size), (0, 0, 0, 0)),
+            'shelves': [[0, height, width]], 'bottom': height, 'width': 0,
+        }
+        return sheet, 0, 0
+
+    def flush(self, folder, state):
+        """裁掉图集未使用的部分并保存"""
+        sheet = state['sheet']
+        file_name = f"{self.prefix}_{len(state['sheets'])}.png"
+        sheet['image'].crop((0, 0, sheet['width'], sheet['bottom'])).save(os.path.join(folder, file_name), format='PNG')
+        state['sheets'].append({'file': file_name, 'width': sheet['width'], 'height': sheet['bottom']})
+        state['sheet'] = None
+
+    def close(self):
+        """保存剩余图集并写入索引，返回 {文件夹: (图集数量, 图标数量, 图集总字节数)}"""
+        stats = {}
+        for folder, state in self.folders.items():
+            if state['sheet'] is not None:
+                self.flush(folder, state)
+            index = {'sheets': state['sheets'], 'icons': state['icons']}
+            with open(os.path.join(folder, f"{self.prefix}.json"), 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False, indent=2)
+            lines = [f".{self.prefix}-icon {{ display: inline-block; background-repeat: no-repeat; }}"]
+            for name, icon in state['icons'].items():
+                sheet = state['sheets'][icon['sheet']]
+                lines.append(
+                    f".{self.prefix}-icon[data-icon={css_string(os.path.splitext(name)[0])}] {{ "
+                    f"width: {icon['width']}px; height: {icon['height']}px; "
+                    f"background-image: url({css_string(sheet['file'])}); "
+                    f"background-position: {-icon['x']}px {-icon['y']}px; }}")
+            with open(os.path.join(folder, f"{self.prefix}.css"), 'w', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+            total = sum(os.path.getsize(os.path.join(folder, sheet['file'])) for sheet in state['sheets'])
+            stats[folder] = (len(state['sheets']), len(state['icons']), total)
+        self.folders = {}
+        return stats
+
+
+parser = argparse.ArgumentParser(description="基质叠加工具")
+parser.add_argument('--atlas', nargs='?', type=int, const=ATLAS_MAX_SIZE, default=0, metavar='SIZE',
+                    help=f'把输出打包为图集（边长不超过 SIZE，默认 {ATLAS_MAX_SIZE}），并写入 atlas.json 与 atlas.css 索引')
+args = parser.parse_args()
+atlas = AtlasWriter(args.atlas) if args.atlas > 0 else None
+
 current_dir = os.getcwd()
 
 base_dir = os.path.join(current_dir, 'base')
@@ -38,8 +130,14 @@ for base_file in base_files:
 
         output_filename = f'{base_name}_{icon_name}.png'
         output_path = os.path.join(output_dir, output_filename)
-        result_image.save(output_path)
+        if atlas:
+            atlas.add(output_path, result_image)
+        else:
+            result_image.save(output_path)
         
         print(f'已生成: {output_filename}')
 
+if atlas:
+    for sheets, icons, total in atlas.close().values():
+        print(f'图集: {icons} 个图标打包为 {sheets} 张图集，共 {total / 1024:.1f} KB')
 print('叠加完成！')
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+mission.py 基准测试
+
+用法：
+    python bench_mission.py memory [--missions 100000]
+    python bench_mission.py classifier [--ids 1000000]
+    python bench_mission.py pipeline [--missions 20000] [--texts 100000]
+    python bench_mission.py items [--missions 5000] [--locales CN,EN]
+"""
+
+import io
+import os
+import re
+import json
+import sys
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+import mission
+import synth_data
+
+
+def synthetic_payload(base_dir, missions=100000, items=2000, texts=20000, seed=0):
+    """在内存中构造与 locale_payload() 相同结构的合成数据，并把对应的 i18n 表写入 base_dir"""
+    rng = random.Random(seed)
+    i18n = {f"txt_{i}": f"文本{i} <@qu.key>要点{i % 97}</>" for i in range(texts)}
+    i18n.update({f"item_name_{i}": f"物品{i}" for i in range(items)})
+    item_table = {f"item_{i}": {"name": {"id": f"item_name_{i}"}} for i in range(items)}
+    prefixes = ["e", "m", "c", "f", "sm", "gm", "a", "dm", "db"]
+
+    skeleton = {}
+    for i in range(missions):
+        mid = f"{rng.choice(prefixes)}{i // 50}m{i % 50}_{i}"
+        skeleton[mid] = {
+            "name": [(f"txt_{rng.randrange(texts)}", False)],
+            "desc": f"txt_{rng.randrange(texts)}",
+            "level": f"lv_{rng.randrange(200)}",
+            "rewards": [(f"item_{rng.randrange(items)}", rng.choice([1, 2, 5, 10, 100, 2000])) for _ in range(3)],
+            "reward_ids": [f"rw_{i}"],
+            "objectives": [f"txt_{rng.randrange(texts)}" for _ in range(3)],
+            "source": "Table",
+        }
+
+    os.makedirs(os.path.join(base_dir, "TableCfg"), exist_ok=True)
+    with open(mission.i18n_path("CN", base_dir), 'w', encoding='utf-8') as f:
+        json.dump(i18n, f, ensure_ascii=False)
+    text_keys = set(i18n)
+    reward_table = {sk["reward_ids"][0]: {"itemBundles": [{"id": iid, "count": count} for iid, count in sk["rewards"]]}
+                    for sk in skeleton.values()}
+    return {
+        "base_dir": base_dir, "skeleton": skeleton, "text_keys": text_keys, "i18n_keys": set(text_keys),
+        "text_table": {}, "item_table": item_table, "reward_table": reward_table,
+    }
+
+
+def legacy_resolve(app):
+    """重建旧版 master_db 形式：每个任务一个 dict，奖励为格式化后的字符串列表"""
+    master_db = {}
+    for mid, sk in app.skeleton.items():
+        name = ""
+        for key, from_runtime in sk["name"]:
+            val = app.resolve(key)
+            if not from_runtime or (val and val != mid): name = val
+        objectives = []
+        for key in sk["objectives"]:
+            txt = re.sub(r"<@qu\.key>(.*?)</>", r"【\1】", app.resolve(key))
+            if txt: objectives.append(txt)
+        master_db[mid] = {
+            "name": name, "desc": app.resolve(sk["desc"]), "level": sk["level"],
+            "rewards": [f"{app.resolve_item_name(iid)} x{count}" for iid, count in sk["rewards"]],
+            "objectives": objectives, "source": sk["source"],
+        }
+    return master_db
+
+
+def quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return result, size
+
+
+def legacy_classify(mid):
+    """旧版逐条正则的系列分类，作为 SeriesClassifier 的对照"""
+    if mid.startswith('c') and re.match(r'(c\d+)', mid): series_key = re.match(r'(c\d+)', mid).group(1)
+    elif mid.startswith('e') and re.match(r'(e\d+)', mid): series_key = re.match(r'(e\d+)', mid).group(1)
+    elif (mid.startswith('db') or mid.startswith('a') or mid.startswith('dm')) and re.match(r'([a-z]+\d+m\d+)', mid):
+        series_key = re.match(r'([a-z]+\d+m\d+)', mid).group(1)
+    else: series_key = mid
+    view_type = None
+    prefix_match = re.match(r"([a-z]+)", series_key)
+    if prefix_match and prefix_match.group(1) in mission.PREFIX_MAP: view_type = mission.PREFIX_MAP[prefix_match.group(1)]
+    folder = "[未分类]" if view_type is None else mission.VIEW_TYPE_MAP.get(view_type, "99_其他")
+    return series_key, view_type, folder
+
+
+def synthetic_ids(count, seed=0):
+    """生成覆盖各类前缀与不规则写法的任务 ID，约一半为重复出现的 ID"""
+    rng = random.Random(seed)
+    prefixes = ["e", "m", "c", "f", "sm", "gm", "a", "dm", "db", "x", "l", "ab", "dbm", ""]
+    ids = []
+    for i in range(count):
+        if ids and rng.random() < 0.5:
+            ids.append(rng.choice(ids))
+            continue
+        p = rng.choice(prefixes)
+        shape = rng.randrange(5)
+        if shape == 0: mid = f"{p}{rng.randrange(100)}m{rng.randrange(50)}_{i}"
+        elif shape == 1: mid = f"{p}{rng.randrange(100)}_{i}"
+        elif shape == 2: mid = f"{p}l{rng.randrange(100)}m{i}"
+        elif shape == 3: mid = f"{p}m{i}"
+        else: mid = f"{p}{i}"
+        ids.append(mid)
+    return ids
+
+
+def bench_classifier(args):
+    ids = synthetic_ids(args.ids)
+
+    start = time.perf_counter()
+    legacy = [legacy_classify(mid) for mid in ids]
+    legacy_time = time.perf_counter() - start
+
+    classifier = mission.SeriesClassifier()
+    start = time.perf_counter()
+    cold = [classifier.classify(mid) for mid in ids]
+    cold_time = time.perf_counter() - start
+    start = time.perf_counter()
+    warm = [classifier.classify(mid) for mid in ids]
+    warm_time = time.perf_counter() - start
+
+    mismatches = sum(1 for old, new in zip(legacy, cold) if old != (new.series_key, new.view_type, new.folder))
+    result = {
+        "ids": args.ids,
+        "unique_ids": len(classifier.cache),
+        "legacy_seconds": round(legacy_time, 4),
+        "classifier_seconds": round(cold_time, 4),
+        "memoized_seconds": round(warm_time, 4),
+        "speedup": round(legacy_time / cold_time, 2) if cold_time else 0,
+        "mismatches": mismatches,
+    }
+    print(f"任务 ID 数量: {args.ids}（不同 ID {result['unique_ids']} 个）")
+    print(f"旧版逐条正则: {legacy_time:.3f}s")
+    print(f"SeriesClassifier（首次）: {cold_time:.3f}s（{result['speedup']}x）")
+    print(f"SeriesClassifier（缓存命中）: {warm_time:.3f}s")
+    print(f"结果不一致: {mismatches} 个")
+    if mismatches or cold != warm: raise SystemExit("分类结果与旧版规则不一致")
+    return result
+
+
+def peak_rss():
+    """进程启动以来累计的峰值常驻内存（字节），只增不减；无法获取时返回 None"""
+    if resource:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    if psutil: return getattr(psutil.Process().memory_info(), "peak_wset", None)
+    return None
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def timed_phase(phases, name, func, trace_memory):
+    """执行一个阶段，记录耗时、到该阶段结束为止的进程累计峰值内存，以及（可选）该阶段内 Python 分配的峰值"""
+    if trace_memory: tracemalloc.reset_peak()
+    start = time.perf_counter()
+    with quiet(): result = func()
+    phase = {"seconds": round(time.perf_counter() - start, 4), "cumulative_peak_rss_bytes": peak_rss()}
+    if trace_memory: phase["peak_traced_bytes"] = tracemalloc.get_traced_memory()[1]
+    phases[name] = phase
+    return result
+
+
+def run_pipeline(base_dir, output_root, args):
+    cache = mission.TableCache(os.path.join(output_root + "_cache")) if args.cache else None
+    formats = [fmt.strip() for fmt in args.format.split(",") if fmt.strip()]
+    if cache:
+        # 先完整运行一次填充缓存，计时的是缓存命中后的运行
+        with quiet(): mission.WikiGeneratorClean(cache=cache, stream_text=args.stream_text, jobs=args.jobs, base_dir=base_dir)
+        cache.hits = cache.misses = 0
+
+    phases = {}
+    if args.trace_memory: tracemalloc.start()
+    try:
+        app = timed_phase(phases, "init", lambda: mission.WikiGeneratorClean(
+            cache=cache, stream_text=args.stream_text, jobs=args.jobs, base_dir=base_dir), args.trace_memory)
+        timed_phase(phases, "build_skeleton", app.build_skeleton, args.trace_memory)
+        timed_phase(phases, "generate", lambda: app.generate(output_root, incremental=False, formats=formats),
+                    args.trace_memory)
+    finally:
+        if args.trace_memory: tracemalloc.stop()
+    written = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(output_root) for f in files)
+    return phases, len(app.master_db), written
+
+
+def bench_pipeline(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.data:
+            base_dir, dataset = args.data, {"path": os.path.abspath(args.data)}
+        else:
+            base_dir = os.path.join(tmp, "endfielddata")
+            dataset = synth_data.generate_dataset(base_dir, **synth_data.dataset_options(args))
+        phases, missions, written = run_pipeline(base_dir, os.path.join(tmp, "Mission"), args)
+
+    result = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "dataset": dataset,
+        "options": {"format": args.format, "stream_text": args.stream_text, "jobs": args.jobs,
+                    "cache": args.cache, "trace_memory": args.trace_memory},
+        "phases": phases,
+        "total_seconds": round(sum(p["seconds"] for p in phases.values()), 4),
+        "peak_rss_bytes": peak_rss(),
+        "missions": missions,
+        "output_bytes": written,
+    }
+    if args.data: print(f"数据: {dataset['path']}")
+    else: print(f"合成数据: {dataset['missions']} 个任务、{dataset['texts']} 条文本、{dataset['runtime_assets']} 个运行时资产")
+    for name, phase in phases.items():
+        line = f"{name:<15} {phase['seconds']:>8.3f}s"
+        if phase["cumulative_peak_rss_bytes"]: line += f"  累计峰值 RSS {phase['cumulative_peak_rss_bytes'] / 2**20:.1f} MiB"
+        if "peak_traced_bytes" in phase: line += f"  阶段峰值分配 {phase['peak_traced_bytes'] / 2**20:.1f} MiB"
+        print(line)
+    print(f"合计 {result['total_seconds']:.3f}s，生成 {missions} 个任务，输出 {written / 2**20:.1f} MiB")
+    if result["peak_rss_bytes"] is None and not args.trace_memory:
+        print("当前平台无法读取进程峰值内存，可使用 --trace-memory 记录各阶段的 Python 峰值分配")
+    if args.baseline: compare_pipeline(mission.load_json(args.baseline).get("pipeline", {}), result)
+    return result
+
+
+def compare_pipeline(old, new):
+    """与之前保存的 pipeline 结果对比各阶段耗时与峰值内存"""
+    print(f"\n对比基线 {old.get('revision') or '?'} -> {new['revision'] or '?'}:")
+    for name, phase in new["phases"].items():
+        before = old.get("phases", {}).get(name)
+        if not before: continue
+        delta = phase["seconds"] / before["seconds"] - 1 if before["seconds"] else 0
+        print(f"{name:<15} {before['seconds']:>8.3f}s -> {phase['seconds']:>8.3f}s  ({delta:+.1%})")
+    if old.get("peak_rss_bytes") and new["peak_rss_bytes"]:
+        print(f"{'peak_rss':<15} {old['peak_rss_bytes'] / 2**20:>7.1f}M -> {new['peak_rss_bytes'] / 2**20:>7.1f}M  "
+              f"({new['peak_rss_bytes'] / old['peak_rss_bytes'] - 1:+.1%})")
+
+
+def bench_memory(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        payload = synthetic_payload(tmp, missions=args.missions)
+        with quiet(): app = mission.WikiGeneratorClean.from_payload(payload, "CN")
+        app.master_db = None
+
+        legacy, legacy_size = measure(lambda: legacy_resolve(app))
+        del legacy
+        app.item_ids, app.item_slots = [], {}
+        with quiet(): compact, compact_size = measure(app.resolve_missions)
+
+    result = {
+        "missions": args.missions,
+        "legacy_bytes": legacy_size,
+        "compact_bytes": compact_size,
+        "reduction": round(1 - compact_size / legacy_size, 4) if legacy_size else 0,
+    }
+    print(f"任务数量: {args.missions}")
+    print(f"dict 记录（格式化字符串）: {legacy_size / 2**20:.1f} MiB")
+    print(f"MissionRecord（紧凑记录）: {compact_size / 2**20:.1f} MiB")
+    print(f"内存减少: {result['reduction']:.1%}")
+    return result
+
+
+def bench_items(args):
+    """分别以单语言模式与多语言模式（由骨架 payload 重建）构建物品索引，校验两者一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        base_dir = os.path.join(tmp, "endfielddata")
+        options = synth_data.dataset_options(args)
+        synth_data.generate_dataset(base_dir, **options)
+        with quiet():
+            shared = mission.WikiGeneratorClean(locale=None, base_dir=base_dir)
+            shared.build_skeleton()
+            payload = shared.locale_payload()
+        result = {"missions": args.missions, "locales": {}}
+        for locale in options["locales"]:
+            with quiet():
+                single = mission.WikiGeneratorClean(locale=locale, base_dir=base_dir)
+                single.build_skeleton()
+                worker = mission.WikiGeneratorClean.from_payload(payload, locale)
+            expected, single_time = timed(single.build_item_index)
+            actual, worker_time = timed(worker.build_item_index)
+            same = vars(expected) == vars(actual)
+            result["locales"][locale] = {"items": len(expected.items), "payload_items": len(actual.items),
+                                         "single_seconds": round(single_time, 4),
+                                         "payload_seconds": round(worker_time, 4), "identical": same}
+            print(f"[{locale}] 单语言 {len(expected.items)} 个物品（{single_time:.3f}s），"
+                  f"多语言 {len(actual.items)} 个物品（{worker_time:.3f}s），{'一致' if same else '不一致'}")
+    if not all(r["identical"] for r in result["locales"].values()):
+        raise SystemExit("多语言模式的物品索引与单语言模式不一致")
+    return result
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mission.py 基准测试")
+    parser.add_argument('--json', default=None, help='把结果写入 JSON 文件')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('memory', help='比较 master_db 的 dict 记录与 MissionRecord 的内存占用')
+    p.add_argument('--missions', type=int, default=100000, help='合成任务数量')
+    p.set_defaults(func=bench_memory)
+    p = sub.add_parser('classifier', help='比较系列分类器与旧版逐条正则的速度，并校验结果一致')
+    p.add_argument('--ids', type=int, default=1000000, help='合成任务 ID 数量')
+    p.set_defaults(func=bench_classifier)
+    p = sub.add_parser('pipeline', help='分别计时 __init__、build_skeleton 与 generate，并报告峰值内存')
+    p.add_argument('--data', default=None, help='使用已有的 endfielddata 目录，不生成合成数据')
+    synth_data.add_arguments(p)
+    p.add_argument('--format', default='markdown', help='输出格式，同 mission.py --format')
+    p.add_argument('--stream-text', action='store_true', help='流式加载文本表')
+    p.add_argument('--jobs', '-j', type=int, default=1, help='解析运行时资产的进程数')
+    p.add_argument('--cache', action='store_true', help='先填充表格缓存，计时缓存命中后的运行')
+    p.add_argument('--trace-memory', action='store_true', help='使用 tracemalloc 记录各阶段的峰值分配（会明显变慢）')
+    p.add_argument('--baseline', default=None, help='与之前用 --json 保存的结果对比')
+    p.set_defaults(func=bench_pipeline)
+    p = sub.add_parser('items', help='校验多语言模式与单语言模式生成的物品索引一致')
+    synth_data.add_arguments(p)
+    p.set_defaults(func=bench_items)
+    args = parser.parse_args()
+
+    result = args.func(args)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({args.command: result}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,46 @@
 import json
 import os
 import re
+import sys
 import shutil
 import glob
-from collections import defaultdict
+import pickle
+import sqlite3
+import zipfile
+import hashlib
+import time
+import argparse
+import threading
+import contextlib
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 BASE_DIR = "endfielddata"
 OUTPUT_ROOT = "Mission"
 
-FILES = {
-    "mission_data":   os.path.join(BASE_DIR, "TableCfg/MissionDataTable.json"),
-    "text_table":     os.path.join(BASE_DIR, "TableCfg/TextTable.json"),
-    "i18n":           os.path.join(BASE_DIR, "TableCfg/I18nTextTable_CN.json"),
-    "reward":         os.path.join(BASE_DIR, "TableCfg/RewardTable.json"),
-    "item":           os.path.join(BASE_DIR, "TableCfg/ItemTable.json"),
+TABLE_FILES = {
+    "mission_data":   "TableCfg/MissionDataTable.json",
+    "text_table":     "TableCfg/TextTable.json",
+    "i18n":           "TableCfg/I18nTextTable_CN.json",
+    "reward":         "TableCfg/RewardTable.json",
+    "item":           "TableCfg/ItemTable.json",
 }
+FILES = {k: os.path.join(BASE_DIR, v) for k, v in TABLE_FILES.items()}
 
-RUNTIME_ASSET_DIR = os.path.join(BASE_DIR, "Json/MissionRuntimeAsset")
+RUNTIME_ASSET_SUBDIR = "Json/MissionRuntimeAsset"
+RUNTIME_ASSET_DIR = os.path.join(BASE_DIR, RUNTIME_ASSET_SUBDIR)
+
+DEFAULT_LOCALE = "CN"
+I18N_FILE = "TableCfg/I18nTextTable_{}.json"
+
+MANIFEST_NAME = ".manifest.json"
+WRITE_WORKERS = min(4, os.cpu_count() or 1)
+
+CACHE_DIR = ".mission_cache"
+CACHE_VERSION = 1
+
+TEXT_TABLES = ("text_table", "i18n")
+_MISSING = object()
 
 VIEW_TYPE_MAP = {
     0: "01_主线剧情 (Main)",
@@ -32,12 +56,438 @@ PREFIX_MAP = {
     "a":  4, "dm": 99, "db": 4, "hidden": 99 
 }
 
+SERIES_RULES = [
+    {"prefixes": ["c"], "pattern": r"c\d+"},
+    {"prefixes": ["e"], "pattern": r"e\d+"},
+    {"prefixes": ["db", "a", "dm"], "pattern": r"[a-z]+\d+m\d+"},
+]
+
+SeriesInfo = namedtuple("SeriesInfo", "series_key prefix view_type folder")
+
+class SeriesClassifier:
+    """任务系列分类器：一次匹配得到系列键、前缀、分类编号与分类目录，结果按任务 ID 缓存
+
+    规则按顺序尝试：任务 ID 以规则的某个前缀开头且匹配其正则时，匹配到的部分即为系列键；
+    都不匹配时系列键为任务 ID 本身。分类目录由系列键开头的字母前缀经 prefix_map 与 view_types 决定。
+    """
+    def __init__(self, rules=None, prefix_map=None, view_types=None):
+        self.rules = SERIES_RULES if rules is None else rules
+        self.prefix_map = PREFIX_MAP if prefix_map is None else prefix_map
+        self.view_types = VIEW_TYPE_MAP if view_types is None else view_types
+        # 按首字符分派，每个 ID 最多只尝试首字符相同的规则
+        self.by_char = defaultdict(list)
+        for rule in self.rules:
+            prefixes = tuple(rule["prefixes"])
+            regex = re.compile(rule["pattern"])
+            for ch in dict.fromkeys(p[0] for p in prefixes if p):
+                self.by_char[ch].append((prefixes, regex))
+        self.by_char = dict(self.by_char)
+        self.prefix_re = re.compile(r"[a-z]+")
+        self.cache = {}
+        self.key_cache = {}
+
+    @classmethod
+    def from_config(cls, path):
+        """从 JSON 配置加载规则：{"rules": [...], "prefix_map": {...}, "view_types": {...}}，缺省项使用内置规则"""
+        config = load_json(path)
+        view_types = config.get("view_types")
+        if view_types is not None: view_types = {int(k): v for k, v in view_types.items()}
+        return cls(config.get("rules"), config.get("prefix_map"), view_types)
+
+    def classify(self, mid):
+        info = self.cache.get(mid)
+        if info is None:
+            series_key = mid
+            for prefixes, regex in self.by_char.get(mid[:1], ()):
+                if mid.startswith(prefixes):
+                    m = regex.match(mid)
+                    if m:
+                        series_key = m.group(0)
+                        break
+            info = self.cache[mid] = self.key_info(series_key)
+        return info
+
+    def key_info(self, series_key):
+        info = self.key_cache.get(series_key)
+        if info is None:
+            m = self.prefix_re.match(series_key)
+            prefix = m.group(0) if m else ""
+            view_type = self.prefix_map.get(prefix) if prefix else None
+            folder = "[未分类]" if view_type is None else self.view_types.get(view_type, "99_其他")
+            info = self.key_cache[series_key] = SeriesInfo(series_key, prefix, view_type, folder)
+        return info
+
 def load_json(path):
     if not os.path.exists(path): return {}
     try:
         with open(path, 'r', encoding='utf-8') as f: return json.load(f)
     except: return {}
 
+def stream_json_items(path, chunk_size=1 << 20):
+    """逐项解析顶层 JSON 对象，依次产出 (key, value)，不在内存中构建整个字典"""
+    decoder = json.JSONDecoder()
+    ws = re.compile(r'[ \t\n\r]*')
+    with open(path, 'r', encoding='utf-8') as f:
+        buf, pos, eof = "", 0, False
+
+        def more():
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def peek():
+            nonlocal pos
+            while True:
+                pos = ws.match(buf, pos).end()
+                if pos < len(buf): return buf[pos]
+                if not more(): raise ValueError(f"JSON 意外结束: {path}")
+
+        def value():
+            nonlocal pos
+            peek()
+            while True:
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                    # 数字等值可能在缓冲区末尾被截断，须看到后续分隔符才算完整
+                    nxt = ws.match(buf, end).end()
+                    if eof or (nxt < len(buf) and buf[nxt] in ',:}'):
+                        pos = end
+                        return obj
+                except json.JSONDecodeError:
+                    if eof: raise
+                more()
+
+        if peek() != '{': raise ValueError(f"顶层不是 JSON 对象: {path}")
+        pos += 1
+        if peek() == '}': return
+        while True:
+            key = value()
+            if peek() != ':': raise ValueError(f"JSON 格式错误: {path}")
+            pos += 1
+            yield key, value()
+            sep = peek()
+            pos += 1
+            if sep == '}': return
+            if sep != ',': raise ValueError(f"JSON 格式错误: {path}")
+
+def load_json_filtered(path, keys):
+    if not os.path.exists(path): return {}
+    try: return {k: v for k, v in stream_json_items(path) if k in keys}
+    except ValueError:
+        data = load_json(path)
+        return {k: v for k, v in data.items() if k in keys} if isinstance(data, dict) else {}
+
+def keys_digest(keys):
+    h = hashlib.blake2b(digest_size=16)
+    for k in sorted(keys): h.update(k.encode('utf-8') + b'\0')
+    return h.hexdigest()
+
+def file_digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''): h.update(chunk)
+    return h.hexdigest()
+
+class TableCache:
+    """解析后表格的持久化缓存，每个源文件对应一个 pickle 条目。
+
+    条目以源文件绝对路径为键，头部记录 size、mtime 与内容哈希；
+    size 与 mtime 一致时直接命中，仅 mtime 变化时再比对哈希。
+    """
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, path):
+        key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _store(self, entry_path, header, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{entry_path}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, entry_path)
+
+    def load_artifact(self, name, signature):
+        """读取按签名校验的派生数据（如任务指纹），签名不一致时返回 None"""
+        try:
+            with open(os.path.join(self.cache_dir, f"{name}.pkl"), 'rb') as f:
+                header = pickle.load(f)
+                if header.get("version") == CACHE_VERSION and header.get("signature") == signature:
+                    self.hits += 1
+                    return pickle.load(f)
+        except Exception: pass
+        self.misses += 1
+        return None
+
+    def store_artifact(self, name, signature, data):
+        try: self._store(os.path.join(self.cache_dir, f"{name}.pkl"), {"version": CACHE_VERSION, "signature": signature}, data)
+        except Exception as e: print(f"写入缓存失败: {name} - {e}")
+
+    def load(self, path, loader=None, variant=None):
+        """variant 用于区分同一源文件的不同解析结果（如按键过滤后的文本表）"""
+        loader = loader or load_json
+        if not os.path.exists(path): return {}
+        st = os.stat(path)
+        entry_path = self._entry_path(path)
+        header = {"version": CACHE_VERSION, "path": os.path.abspath(path), "variant": variant,
+                  "size": st.st_size, "mtime": st.st_mtime_ns, "hash": None}
+        try:
+            with open(entry_path, 'rb') as f:
+                cached = pickle.load(f)
+                if (cached.get("version") == CACHE_VERSION and cached.get("path") == header["path"]
+                        and cached.get("variant") == variant and cached.get("size") == st.st_size):
+                    if cached.get("mtime") == st.st_mtime_ns:
+                        self.hits += 1
+                        return pickle.load(f)
+                    header["hash"] = file_digest(path)
+                    if cached.get("hash") == header["hash"]:
+                        data = pickle.load(f)
+                        self.hits += 1
+                        self._store(entry_path, header, data)
+                        return data
+        except Exception: pass
+
+        self.misses += 1
+        header["hash"] = header["hash"] or file_digest(path)
+        data = loader(path)
+        if data:
+            try: self._store(entry_path, header, data)
+            except Exception as e: print(f"写入缓存失败: {path} - {e}")
+        return data
+
+class Instrumentation:
+    """可选的性能记录：阶段耗时（span）、表格加载与计数器，可导出为 JSON 报告或 Chrome trace
+
+    通过 enable_instrumentation() 开启；未开启时各记录点只做一次 None 判断。
+    """
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events = []
+        self.tables = []
+        self.counters = defaultdict(int)
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name, category="phase", **args):
+        start = time.perf_counter()
+        try: yield args
+        finally:
+            event = {"name": name, "cat": category, "start": start, "dur": time.perf_counter() - start,
+                     "pid": os.getpid(), "tid": threading.get_native_id(), "args": args}
+            with self.lock: self.events.append(event)
+
+    def count(self, name, n=1):
+        with self.lock: self.counters[name] += n
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def merge(self, other):
+        """合并子进程返回的记录（export() 的结果）"""
+        self.events.extend(other["events"])
+        self.tables.extend(other["tables"])
+        for k, v in other["counters"].items(): self.counters[k] += v
+        self.gauges.update(other["gauges"])
+
+    def export(self):
+        return {"events": self.events, "tables": self.tables, "counters": dict(self.counters), "gauges": self.gauges}
+
+    def report(self):
+        phases = {}
+        for e in self.events:
+            if e["cat"] != "phase": continue
+            p = phases.setdefault(e["name"], {"calls": 0, "seconds": 0.0})
+            p["calls"] += 1
+            p["seconds"] += e["dur"]
+        for p in phases.values(): p["seconds"] = round(p["seconds"], 6)
+        counters = dict(self.counters)
+        derived = {}
+        parse_seconds = sum(e["dur"] for e in self.events if e["name"] == "load_runtime_records")
+        if parse_seconds and counters.get("runtime_assets"):
+            derived["runtime_assets_per_second"] = round(counters["runtime_assets"] / parse_seconds, 1)
+        return {
+            "wall_seconds": round(time.perf_counter() - self.origin, 6),
+            "phases": phases,
+            "tables": self.tables,
+            "counters": counters,
+            "gauges": self.gauges,
+            "derived": derived,
+        }
+
+    def chrome_trace(self):
+        events = [{"name": e["name"], "cat": e["cat"], "ph": "X", "pid": e["pid"], "tid": e["tid"],
+                   "ts": round((e["start"] - self.origin) * 1e6, 1), "dur": round(e["dur"] * 1e6, 1), "args": e["args"]}
+                  for e in self.events]
+        ts = round((time.perf_counter() - self.origin) * 1e6, 1)
+        events.append({"name": "counters", "ph": "C", "pid": os.getpid(), "tid": 0, "ts": ts, "args": dict(self.counters)})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, report_path=None, trace_path=None):
+        for path, data in ((report_path, self.report), (trace_path, self.chrome_trace)):
+            if not path: continue
+            with open(path, 'w', encoding='utf-8') as f: json.dump(data(), f, ensure_ascii=False, indent=1)
+            print(f"写入性能记录: {path}")
+
+INSTRUMENTS = None
+
+def enable_instrumentation():
+    global INSTRUMENTS
+    if INSTRUMENTS is None: INSTRUMENTS = Instrumentation()
+    return INSTRUMENTS
+
+def span(name, category="phase", **args):
+    """未开启记录时返回空上下文"""
+    return INSTRUMENTS.span(name, category, **args) if INSTRUMENTS else contextlib.nullcontext(args)
+
+def count(name, n=1):
+    if INSTRUMENTS: INSTRUMENTS.count(name, n)
+
+def record_output(path):
+    """记录写出的文件数与字节数"""
+    if INSTRUMENTS:
+        INSTRUMENTS.count("files_written")
+        INSTRUMENTS.count("bytes_written", os.path.getsize(path))
+
+def content_digest(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+class OutputWriter:
+    """有界的文件写入线程池
+
+    渲染线程只提交完整的文件内容；写入线程先写临时文件再原子重命名，
+    等待写入的文件超过 max_pending 个时提交会阻塞，以限制内存占用。
+    目录由调用方预先创建。workers <= 1 时在当前线程同步写入。
+    """
+    def __init__(self, workers=WRITE_WORKERS, max_pending=None):
+        self.pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        self.slots = threading.BoundedSemaphore(max_pending or workers * 16)
+        self.futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def write_file(full_path, content):
+        tmp_path = f"{full_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f: f.write(content)
+        os.replace(tmp_path, full_path)
+        record_output(full_path)
+        return os.path.getsize(full_path)
+
+    def _write(self, full_path, content):
+        try: return self.write_file(full_path, content)
+        finally: self.slots.release()
+
+    def submit(self, full_path, content, done):
+        """写入完成后以文件大小调用 done(size)"""
+        if not self.pool:
+            done(self.write_file(full_path, content))
+            return
+        self.slots.acquire()
+        future = self.pool.submit(self._write, full_path, content)
+        self.futures.append((future, done))
+
+    def close(self):
+        """等待全部写入完成；任何一个文件写入失败都会在这里抛出"""
+        if not self.pool: return
+        try:
+            for future, done in self.futures: done(future.result())
+        finally:
+            self.pool.shutdown()
+            self.futures = []
+
+def sync_output_tree(output_root, outputs, workers=WRITE_WORKERS):
+    """按清单中记录的内容哈希增量写入输出目录，只重写内容变化的文件
+
+    只删除上次清单中记录、本次不再生成的文件，输出目录中其他文件（如 .git、README）保持不动。
+    """
+    manifest_path = os.path.join(output_root, MANIFEST_NAME)
+    old_manifest = load_json(manifest_path)
+    new_manifest = {}
+    stats = {"written": 0, "unchanged": 0, "removed": 0}
+
+    write_changed(output_root, outputs, old_manifest, new_manifest, stats, workers)
+
+    for rel_path in sorted(set(old_manifest) - set(new_manifest)):
+        if remove_output(output_root, rel_path): stats["removed"] += 1
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(new_manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    count("files_unchanged", stats["unchanged"])
+    count("files_removed", stats["removed"])
+    return stats
+
+def remove_output(output_root, rel_path):
+    """删除一个过期的输出文件，并向上删除因此变空的子目录（不包括输出目录本身）"""
+    full_path = os.path.join(output_root, rel_path)
+    if not os.path.isfile(full_path): return False
+    os.remove(full_path)
+    parent = os.path.dirname(full_path)
+    while os.path.normpath(parent) != os.path.normpath(output_root) and os.path.isdir(parent) and not os.listdir(parent):
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
+    return True
+
+def write_changed(output_root, outputs, old_manifest, new_manifest, stats, workers=WRITE_WORKERS):
+    """把内容有变化的文件交给 OutputWriter 写入，并更新 new_manifest"""
+    changed = []
+    for rel_path, content in outputs.items():
+        digest = content_digest(content)
+        full_path = os.path.join(output_root, rel_path)
+        old = old_manifest.get(rel_path)
+        if old and old.get("hash") == digest and os.path.isfile(full_path) and os.path.getsize(full_path) == old.get("size"):
+            new_manifest[rel_path] = old
+            stats["unchanged"] += 1
+        else: changed.append((rel_path, full_path, content, digest))
+
+    for d in {os.path.dirname(full_path) for _, full_path, _, _ in changed}: os.makedirs(d, exist_ok=True)
+    with span("write_files", files=len(changed), workers=workers), OutputWriter(workers) as writer:
+        for rel_path, full_path, content, digest in changed:
+            def done(size, rel_path=rel_path, digest=digest): new_manifest[rel_path] = {"hash": digest, "size": size}
+            writer.submit(full_path, content, done)
+    stats["written"] += len(changed)
+
+def patch_output_tree(output_root, outputs, stale_paths=(), workers=WRITE_WORKERS):
+    """只更新给定的文件并删除 stale_paths，清单中其余条目保持不变"""
+    manifest_path = os.path.join(output_root, MANIFEST_NAME)
+    manifest = load_json(manifest_path)
+    stats = {"written": 0, "unchanged": 0, "removed": 0}
+    for rel_path in stale_paths:
+        if rel_path in outputs: continue
+        manifest.pop(rel_path, None)
+        if remove_output(output_root, rel_path): stats["removed"] += 1
+    write_changed(output_root, outputs, manifest, manifest, stats, workers)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    count("files_unchanged", stats["unchanged"])
+    count("files_removed", stats["removed"])
+    return stats
+
+def data_signature(base_dir, locale=DEFAULT_LOCALE):
+    """由全部输入文件的路径、大小与修改时间计算数据目录的签名"""
+    files = table_files(base_dir)
+    paths = [v for k, v in files.items() if k != "i18n"] + [i18n_path(locale, base_dir)]
+    paths += sorted(glob.glob(os.path.join(base_dir, RUNTIME_ASSET_SUBDIR, "*.json")))
+    h = hashlib.blake2b(digest_size=16)
+    for p in paths:
+        try: st = os.stat(p)
+        except OSError: continue
+        h.update(f"{p}\0{st.st_size}\0{st.st_mtime_ns}\n".encode('utf-8'))
+    return h.hexdigest()
+
 def sanitize_filename(name):
     if not name: return "Unknown"
     return re.sub(r'[\\/*?:"<>|]', "_", name).strip()
@@ -47,166 +497,1087 @@ def iterate_data(data):
     if isinstance(data, dict): return data.values()
     return []
 
+def text_key(key_obj):
+    if isinstance(key_obj, dict):
+        raw_key = (key_obj.get("text") or key_obj.get("id") or
+                   key_obj.get("key") or key_obj.get("Key") or key_obj.get("value"))
+    else: raw_key = key_obj
+    return str(raw_key) if raw_key else ""
+
+def quest_objectives(quest_dic):
+    quests = quest_dic.values() if isinstance(quest_dic, dict) else quest_dic
+    for q in quests:
+        yield from q.get("objectiveList", [])
+
+def extract_runtime_record(fpath):
+    """解析单个 MissionRuntimeAsset，仅返回生成文档所需的文本键与 ID"""
+    data = load_json(fpath)
+    mid = data.get("missionId")
+    if not mid: return None
+    record = {
+        "file": os.path.basename(fpath),
+        "missionId": mid,
+        "name": text_key(data.get("missionName")),
+        "desc": text_key(data.get("missionDescription")),
+        "rewardId": data.get("rewardId"),
+    }
+    if "levelId" in data: record["levelId"] = data["levelId"]
+    if "questDic" in data:
+        record["objectives"] = [text_key(obj.get("description")) for obj in quest_objectives(data["questDic"])]
+    return record
+
+def load_runtime_records(asset_dir=RUNTIME_ASSET_DIR, jobs=1):
+    files = sorted(glob.glob(os.path.join(asset_dir, "*.json")))
+    with span("load_runtime_records", files=len(files), jobs=jobs):
+        if jobs > 1 and len(files) > 1:
+            chunksize = max(1, len(files) // (jobs * 8))
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                records = list(pool.map(extract_runtime_record, files, chunksize=chunksize))
+        else:
+            records = [extract_runtime_record(f) for f in files]
+    if INSTRUMENTS:
+        INSTRUMENTS.count("runtime_assets", len(files))
+        INSTRUMENTS.count("runtime_asset_bytes", sum(os.path.getsize(f) for f in files))
+    return [r for r in records if r]
+
+class MissionRecord:
+    """master_db 中的单个任务
+
+    字符串均已驻留；奖励保存为 (物品槽位, 数量, 物品槽位, 数量, ...) 的扁平整数元组，
+    物品槽位指向生成器的 item_ids 列表，物品名在渲染时才格式化。
+    """
+    __slots__ = ("name", "desc", "level", "rewards", "objectives", "source")
+
+    def __init__(self, name, desc, level, rewards, objectives, source):
+        self.name = name
+        self.desc = desc
+        self.level = level
+        self.rewards = rewards
+        self.objectives = objectives
+        self.source = source
+
+    def has_content(self):
+        return bool(self.name or self.objectives)
+
+def intern_text(value):
+    return sys.intern(value) if type(value) is str else value
+
 def natural_keys(text):
     return [int(c) if c.isdigit() else c for c in re.split(r'(\d+)', text)]
 
+def table_files(base_dir=BASE_DIR):
+    return {k: os.path.join(base_dir, v) for k, v in TABLE_FILES.items()}
+
+def i18n_path(locale, base_dir=BASE_DIR):
+    return os.path.join(base_dir, I18N_FILE.format(locale))
+
+def load_table(path, cache=None, keys=None):
+    """加载单个表格；给定 keys 时流式加载并只保留这些键"""
+    if not INSTRUMENTS: return _load_table(path, cache, keys)
+    hits = cache.hits if cache else 0
+    with INSTRUMENTS.span("load_table", "table", table=os.path.basename(path)) as info:
+        start = time.perf_counter()
+        data = _load_table(path, cache, keys)
+        info.update(seconds=round(time.perf_counter() - start, 6), bytes=os.path.getsize(path) if os.path.isfile(path) else 0,
+                    entries=len(data) if data else 0, cached=bool(cache) and cache.hits > hits, filtered=keys is not None)
+    INSTRUMENTS.tables.append(dict(info, path=path))
+    return data
+
+def _load_table(path, cache=None, keys=None):
+    if keys is None: return cache.load(path) if cache else load_json(path)
+    loader = lambda p: load_json_filtered(p, keys)
+    if cache: return cache.load(path, loader=loader, variant=keys_digest(keys))
+    return loader(path)
+
 class WikiGeneratorClean:
-    def __init__(self):
+    def __init__(self, cache=None, stream_text=False, jobs=1, locale=DEFAULT_LOCALE, base_dir=BASE_DIR, classifier=None):
+        """locale 为 None 时只加载结构表，用于多语言模式下先构建共享骨架"""
+        with span("init", base_dir=base_dir, locale=locale):
+            self._init(cache, stream_text, jobs, locale, base_dir, classifier)
+
+    def _init(self, cache, stream_text, jobs, locale, base_dir, classifier):
         print("加载基础配置表...")
-        self.tables = {k: load_json(v) for k, v in FILES.items()}
-        self.i18n = self.tables['i18n']
-        self.text_table = self.tables['text_table']
+        self.classifier = classifier or SeriesClassifier()
+        self.base_dir = base_dir
+        self.files = table_files(base_dir)
+        self.cache = cache
+        self.stream_text = stream_text
+        self.jobs = jobs
+        self.writers = WRITE_WORKERS
+        self.locale = locale
+        self.tables = {k: load_table(v, cache) for k, v in self.files.items() if k not in TEXT_TABLES}
         self.item_table = self.tables['item']
         self.reward_table = self.tables['reward']
-        
-        self.master_db = defaultdict(lambda: {
-            "name": "", "desc": "", "level": "无", 
-            "rewards": [], "objectives": [],
-            "source": "Unknown"
-        })
+        self.runtime_records = load_runtime_records(os.path.join(base_dir, RUNTIME_ASSET_SUBDIR), jobs=jobs)
 
-    def resolve(self, key_obj):
-        raw_key = ""
-        if isinstance(key_obj, dict):
-            raw_key = (key_obj.get("text") or key_obj.get("id") or 
-                       key_obj.get("key") or key_obj.get("Key") or key_obj.get("value"))
-        else: raw_key = key_obj
-        if not raw_key: return ""
-        key_str = str(raw_key)
+        self.text_keys = self.collect_text_keys()
+        if stream_text: print(f"按引用过滤文本表，共 {len(self.text_keys)} 个文本键")
+        self.text_table = self.tables['text_table'] = load_table(
+            self.files['text_table'], cache, self.text_keys if stream_text else None)
+        self.i18n_keys = self.collect_i18n_keys()
+        self.skeleton = {}
+        self.master_db = {}
+        self.item_ids = []
+        self.item_slots = {}
+        if locale: self.use_locale(locale)
+        if cache: print(f"缓存命中 {cache.hits} 个表，重新解析 {cache.misses} 个表")
+
+    @classmethod
+    def from_payload(cls, payload, locale, cache=None, stream_text=False):
+        """由 locale_payload() 的结果重建生成器，只加载指定语言的文本表"""
+        self = cls.__new__(cls)
+        self.classifier = payload.get("classifier") or SeriesClassifier()
+        self.base_dir = payload["base_dir"]
+        self.files = table_files(self.base_dir)
+        self.cache = cache
+        self.stream_text = stream_text
+        self.jobs = 1
+        self.writers = payload.get("writers", WRITE_WORKERS)
+        self.locale = locale
+        self.text_table = payload["text_table"]
+        self.item_table = payload["item_table"]
+        self.reward_table = payload["reward_table"]
+        self.runtime_records = []
+        self.text_keys = payload["text_keys"]
+        self.i18n_keys = payload["i18n_keys"]
+        self.skeleton = payload["skeleton"]
+        self.tables = {"text_table": self.text_table, "item": self.item_table, "reward": self.reward_table, "mission_data": []}
+        self.master_db = {}
+        self.item_ids = []
+        self.item_slots = {}
+        self.use_locale(locale)
+        self.master_db = self.resolve_missions()
+        return self
+
+    def locale_payload(self):
+        """导出与语言无关、渲染所需的最小数据：骨架、相关的 TextTable 条目、物品名键与奖励内容（物品 ID 与数量）"""
+        item_ids = {iid for sk in self.skeleton.values() for iid, _ in sk["rewards"]}
+        reward_table = {}
+        for rid in {rid for sk in self.skeleton.values() for rid in sk["reward_ids"]}:
+            if rid not in self.reward_table: continue
+            bundles = []
+            self._parse_rewards(rid, bundles)
+            reward_table[rid] = {"itemBundles": [{"id": iid, "count": count} for iid, count in bundles]}
+        return {
+            "base_dir": self.base_dir,
+            "writers": self.writers,
+            "classifier": self.classifier,
+            "skeleton": self.skeleton,
+            "text_keys": self.text_keys,
+            "i18n_keys": self.i18n_keys,
+            "text_table": {k: self.text_table[k] for k in self.text_keys if k in self.text_table},
+            "item_table": {iid: {"name": self.item_table[iid].get("name")}
+                           for iid in item_ids if iid in self.item_table},
+            "reward_table": reward_table,
+        }
+
+    def use_locale(self, locale):
+        self.locale = locale
+        self.i18n = self.tables['i18n'] = load_table(
+            i18n_path(locale, self.base_dir), self.cache, self.i18n_keys if self.stream_text else None)
+        self.resolve_stats = {"hits": 0, "misses": 0, "fallbacks": 0}
+        self.item_names = {}
+        self.build_text_index(self.text_keys)
+
+    def collect_i18n_keys(self):
+        keys = set(self.text_keys)
+        for key in self.text_keys:
+            if key not in self.text_table: continue
+            val = self.text_table[key]
+            if isinstance(val, dict): val = val.get("text") or val.get("id")
+            keys.add(str(val))
+        return keys
+
+    def collect_text_keys(self):
+        """收集任务、运行时资产、奖励与物品中 resolve() 可能查询的全部文本键"""
+        keys = set()
+        reward_ids = set()
+
+        for info in iterate_data(self.tables['mission_data']):
+            if not info.get("missionId"): continue
+            keys.add(text_key(info.get("missionName")))
+            keys.add(text_key(info.get("missionDesc") or info.get("missionDescription")))
+            rid = info.get("missionRewardId") or info.get("rewardId")
+            if rid: reward_ids.add(rid)
+            if "questDic" in info:
+                for obj in quest_objectives(info["questDic"]): keys.add(text_key(obj.get("description")))
+        for rec in self.runtime_records:
+            keys.add(rec["name"])
+            keys.add(rec["desc"])
+            keys.update(rec.get("objectives", ()))
+            if rec["rewardId"]: reward_ids.add(rec["rewardId"])
+
+        for rid in reward_ids:
+            if rid not in self.reward_table: continue
+            info = self.reward_table[rid]
+            for b in info.get("itemBundles") or info.get("rewardList") or []:
+                iid = b.get("id") or b.get("itemId")
+                if iid in self.item_table: keys.add(text_key(self.item_table[iid].get("name")))
+        keys.discard("")
+        return keys
+
+    def build_text_index(self, keys):
+        """预先把文本键直接映射到最终文本，resolve() 只需一次字典查询"""
+        self.text_index = {}
+        self.text_fallbacks = set()
+        for key in keys: self._index_key(key)
+        print(f"文本索引: {len(self.text_index)} 个键，其中 {len(self.text_fallbacks)} 个未找到译文")
+
+    def _index_key(self, key_str):
         if key_str in self.text_table:
             val = self.text_table[key_str]
             if isinstance(val, dict): val = val.get("text") or val.get("id")
-            return self.i18n.get(str(val), str(val))
-        return self.i18n.get(key_str, key_str)
+            key_str_val = str(val)
+        else: key_str_val = key_str
+        text = self.i18n.get(key_str_val, _MISSING)
+        if text is _MISSING:
+            text = key_str_val
+            self.text_fallbacks.add(key_str)
+        text = intern_text(text)
+        self.text_index[key_str] = text
+        return text
+
+    def resolve(self, key_obj):
+        key_str = text_key(key_obj)
+        if not key_str: return ""
+        stats = self.resolve_stats
+        text = self.text_index.get(key_str, _MISSING)
+        if text is _MISSING:
+            stats["misses"] += 1
+            text = self._index_key(key_str)
+        else: stats["hits"] += 1
+        if key_str in self.text_fallbacks: stats["fallbacks"] += 1
+        return text
     
     def resolve_item_name(self, item_id):
+        if item_id in self.item_names: return self.item_names[item_id]
         if item_id in self.item_table:
             name_obj = self.item_table[item_id].get("name")
-            return self.resolve(name_obj)
-        return item_id
+            name = self.resolve(name_obj)
+        else: name = item_id
+        self.item_names[item_id] = name
+        return name
 
     def build_skeleton(self):
+        """构建与语言无关的任务骨架（文本键、物品 ID 与数量），再按当前语言解析为 master_db
+
+        骨架中的 name 记录依次生效的 (文本键, 是否来自运行时资产)：
+        运行时资产的名称仅在解析结果有意义时才覆盖表中的名称。
+        """
         print("构建任务数据骨架...")
-        for info in iterate_data(self.tables['mission_data']):
-            mid = info.get("missionId")
-            if not mid: continue
-            
-            entry = self.master_db[mid]
-            entry["source"] = "Table"
-            entry["name"] = self.resolve(info.get("missionName"))
-            entry["desc"] = self.resolve(info.get("missionDesc") or info.get("missionDescription"))
-            
-            rid = info.get("missionRewardId") or info.get("rewardId")
-            if rid: self._parse_rewards(rid, entry["rewards"])
-            if "questDic" in info: self._parse_quests(info["questDic"], entry["objectives"])
-
-        files = glob.glob(os.path.join(RUNTIME_ASSET_DIR, "*.json"))
-        for fpath in files:
-            data = load_json(fpath)
-            mid = data.get("missionId")
-            if not mid: continue
-            
-            entry = self.master_db[mid]
-            entry["source"] = "Runtime"
-            
-            name = self.resolve(data.get("missionName"))
-            if name and name != mid: entry["name"] = name
-            entry["desc"] = self.resolve(data.get("missionDescription"))
-            if "levelId" in data: entry["level"] = data["levelId"]
-            
-            rid = data.get("rewardId")
-            if rid: 
-                entry["rewards"] = []
-                self._parse_rewards(rid, entry["rewards"])
-            if "questDic" in data:
-                entry["objectives"] = []
-                self._parse_quests(data["questDic"], entry["objectives"])
-
-    def _parse_quests(self, quest_dic, target_list):
-        quests = quest_dic.values() if isinstance(quest_dic, dict) else quest_dic
-        for q in quests:
-            for obj in q.get("objectiveList", []):
-                txt = self.resolve(obj.get("description"))
-                txt = re.sub(r"<@qu\.key>(.*?)</>", r"【\1】", txt)
-                if txt: target_list.append(txt)
+        with span("build_skeleton"):
+            skeleton = defaultdict(self.new_skeleton_entry)
+            for info in iterate_data(self.tables['mission_data']):
+                mid = info.get("missionId")
+                if not mid: continue
+                self.apply_table_row(skeleton[mid], info)
+            for rec in self.runtime_records:
+                self.apply_runtime_record(skeleton[rec["missionId"]], rec)
+            self.skeleton = dict(skeleton)
+        if self.locale: self.master_db = self.resolve_missions()
+
+    @staticmethod
+    def new_skeleton_entry():
+        return {
+            "name": [], "desc": "", "level": "无",
+            "rewards": [], "reward_ids": [], "objectives": [],
+            "source": "Unknown"
+        }
+
+    def apply_table_row(self, entry, info):
+        entry["source"] = "Table"
+        entry["name"] = [(text_key(info.get("missionName")), False)]
+        entry["desc"] = text_key(info.get("missionDesc") or info.get("missionDescription"))
+        
+        rid = info.get("missionRewardId") or info.get("rewardId")
+        if rid:
+            entry["reward_ids"].append(rid)
+            self._parse_rewards(rid, entry["rewards"])
+        if "questDic" in info:
+            entry["objectives"].extend(text_key(obj.get("description")) for obj in quest_objectives(info["questDic"]))
+
+    def apply_runtime_record(self, entry, rec):
+        entry["source"] = "Runtime"
+        
+        entry["name"].append((rec["name"], True))
+        entry["desc"] = rec["desc"]
+        if "levelId" in rec: entry["level"] = rec["levelId"]
+        
+        rid = rec["rewardId"]
+        if rid: 
+            entry["rewards"] = []
+            entry["reward_ids"] = [rid]
+            self._parse_rewards(rid, entry["rewards"])
+        if "objectives" in rec: entry["objectives"] = list(rec["objectives"])
+
+    def resolve_mission(self, mid, sk):
+        name = ""
+        for key, from_runtime in sk["name"]:
+            val = self.resolve(key)
+            if not from_runtime or (val and val != mid): name = val
+        rewards = []
+        for iid, count in sk["rewards"]: rewards += (self.item_slot(iid), count)
+        objectives = []
+        self._parse_objectives(sk["objectives"], objectives)
+        return MissionRecord(name, self.resolve(sk["desc"]), intern_text(sk["level"]), tuple(rewards),
+                             tuple(intern_text(o) for o in objectives), sk["source"])
+
+    def item_slot(self, item_id):
+        slot = self.item_slots.get(item_id)
+        if slot is None:
+            slot = self.item_slots[item_id] = len(self.item_ids)
+            self.item_ids.append(intern_text(item_id))
+        return slot
+
+    def reward_items(self, rec):
+        """展开 MissionRecord.rewards，产出 (物品 ID, 数量)"""
+        r = rec.rewards
+        for i in range(0, len(r), 2): yield self.item_ids[r[i]], r[i + 1]
+
+    def format_rewards(self, rec):
+        return [f"{self.resolve_item_name(iid)} x{count}" for iid, count in self.reward_items(rec)]
+
+    def resolve_missions(self):
+        with span("resolve_missions", locale=self.locale):
+            master_db = {mid: self.resolve_mission(mid, sk) for mid, sk in self.skeleton.items()}
+        st = self.resolve_stats
+        print(f"[{self.locale}] 文本解析: 命中 {st['hits']} 次，未命中 {st['misses']} 次，回退原始键 {st['fallbacks']} 次")
+        return master_db
+
+    def _parse_objectives(self, keys, target_list):
+        for key in keys:
+            txt = self.resolve(key)
+            txt = re.sub(r"<@qu\.key>(.*?)</>", r"【\1】", txt)
+            if txt: target_list.append(txt)
 
     def _parse_rewards(self, reward_id, target_list):
+        """把奖励展开为 (物品 ID, 数量)，物品名在解析阶段按语言生成"""
         if not reward_id or reward_id not in self.reward_table: return
         info = self.reward_table[reward_id]
         bundles = info.get("itemBundles") or info.get("rewardList") or []
         for b in bundles:
             iid = b.get("id") or b.get("itemId")
             count = b.get("count") or b.get("amount") or 1
-            iname = self.resolve_item_name(iid)
-            target_list.append(f"{iname} x{count}")
+            target_list.append((iid, count))
 
     def get_series_key(self, mid):
-        if mid.startswith('c') and re.match(r'(c\d+)', mid): return re.match(r'(c\d+)', mid).group(1)
-        if mid.startswith('e') and re.match(r'(e\d+)', mid): return re.match(r'(e\d+)', mid).group(1)
-        if (mid.startswith('db') or mid.startswith('a') or mid.startswith('dm')) and re.match(r'([a-z]+\d+m\d+)', mid):
-            return re.match(r'([a-z]+\d+m\d+)', mid).group(1)
-        if 'l' in mid: return mid
-        return mid
-
-    def generate(self):
-        print("正在生成数据文档...")
+        return self.classifier.classify(mid).series_key
+
+    def build_series_map(self):
         series_map = defaultdict(list)
         for mid, data in self.master_db.items():
-            if not data["name"] and not data["objectives"]: continue
+            if not data.has_content(): continue
             series_key = self.get_series_key(mid)
             series_map[series_key].append((mid, data))
+        return series_map
 
-        if os.path.exists(OUTPUT_ROOT): shutil.rmtree(OUTPUT_ROOT)
-        os.makedirs(OUTPUT_ROOT)
-        
-        for series_key, missions in series_map.items():
+    def iter_series(self):
+        for series_key, missions in self.build_series_map().items():
             missions.sort(key=lambda x: natural_keys(x[0]))
+            yield series_key, missions
+
+    def series_view_type(self, series_key):
+        return self.classifier.key_info(series_key).view_type
+
+    def series_path(self, series_key, missions):
+        folder_name = self.classifier.key_info(series_key).folder
+
+        file_title = f"{series_key}"
+        for m, d in missions:
+            if d.name and d.name != "Unknown" and d.name != m:
+                file_title = f"{series_key}_{sanitize_filename(d.name)}_等"
+                break
+        if len(missions) == 1:
+            mid, d = missions[0]
+            name_str = d.name if d.name and d.name != "Unknown" else "Unkown"
+            file_title = f"{mid}_{sanitize_filename(name_str)}"
+        return folder_name, f"{file_title}.md"
+
+    def render_series(self, series_key, missions):
+        out = []
+        if len(missions) > 1:
+            out.append(f"# {series_key} 任务数据\n\n---\n")
+        
+        for mid, data in missions:
+            display_name = data.name or mid
+            out.append(f"\n## {display_name}\n")
+            out.append(f"- **任务描述**: {data.desc or '无'}\n")
+            
+            if data.rewards:
+                out.append("\n**任务奖励**:\n")
+                for r in sorted(set(self.format_rewards(data))): out.append(f"- {r}\n")
             
-            folder_name = "[未分类]"
-            prefix_match = re.match(r"([a-z]+)", series_key)
-            if prefix_match:
-                p = prefix_match.group(1)
-                if p in PREFIX_MAP: folder_name = VIEW_TYPE_MAP.get(PREFIX_MAP[p], "99_其他")
-
-            file_title = f"{series_key}"
-            for m, d in missions:
-                if d["name"] and d["name"] != "Unknown" and d["name"] != m:
-                    file_title = f"{series_key}_{sanitize_filename(d['name'])}_等"
-                    break
-            if len(missions) == 1:
-                mid, d = missions[0]
-                name_str = d['name'] if d['name'] and d['name'] != "Unknown" else "Unkown"
-                file_title = f"{mid}_{sanitize_filename(name_str)}"
-
-            final_dir = os.path.join(OUTPUT_ROOT, folder_name)
-            if not os.path.exists(final_dir): os.makedirs(final_dir)
+            if data.objectives:
+                out.append("\n**任务目标**:\n")
+                seen_obj = set()
+                for obj in data.objectives:
+                    if obj not in seen_obj:
+                        out.append(f"- {obj}\n")
+                        seen_obj.add(obj)
             
-            with open(os.path.join(final_dir, f"{file_title}.md"), 'w', encoding='utf-8') as f:
-                if len(missions) > 1:
-                    f.write(f"# {series_key} 任务数据\n\n---\n")
-                
-                for mid, data in missions:
-                    display_name = data['name'] or mid
-                    f.write(f"\n## {display_name}\n")
-                    f.write(f"- **任务描述**: {data['desc'] or '无'}\n")
-                    
-                    if data['rewards']:
-                        f.write("\n**任务奖励**:\n")
-                        for r in sorted(list(set(data["rewards"]))): f.write(f"- {r}\n")
-                    
-                    if data['objectives']:
-                        f.write("\n**任务目标**:\n")
-                        seen_obj = set()
-                        for obj in data['objectives']:
-                            if obj not in seen_obj:
-                                f.write(f"- {obj}\n")
-                                seen_obj.add(obj)
-                    
-                    f.write("\n---\n")
-
-        print(f"全部完成！输出目录: {OUTPUT_ROOT}")
+            out.append("\n---\n")
+        return "".join(out)
 
-if __name__ == "__main__":
-    app = WikiGeneratorClean()
+    def render_all(self):
+        """渲染全部系列文件，返回 {相对路径: 文件内容}"""
+        outputs = {}
+        for series_key, missions in self.iter_series():
+            folder_name, file_name = self.series_path(series_key, missions)
+            outputs[f"{folder_name}/{file_name}"] = self.render_series(series_key, missions)
+        return outputs
+
+    def structured_missions(self):
+        """按系列顺序产出结构化任务记录，供 SQLite / JSONL 等后端使用"""
+        for series_key, missions in self.iter_series():
+            view_type = self.series_view_type(series_key)
+            folder_name, file_name = self.series_path(series_key, missions)
+            for mid, data in missions:
+                rewards = [{"itemId": iid, "name": self.resolve_item_name(iid), "count": count}
+                           for iid, count in self.reward_items(data)]
+                yield {
+                    "missionId": mid, "series": series_key,
+                    "viewType": view_type, "viewTypeName": self.classifier.view_types.get(view_type) if view_type is not None else None,
+                    "path": f"{folder_name}/{file_name}",
+                    "name": data.name, "desc": data.desc, "level": data.level, "source": data.source,
+                    "rewards": rewards, "objectives": list(dict.fromkeys(data.objectives)),
+                }
+
+    def build_item_index(self):
+        """构建 物品 ID → 奖励 ID → 任务 ID 的反向索引（含数量）"""
+        items = defaultdict(dict)
+        rewards = defaultdict(list)
+        for mid, sk in self.skeleton.items():
+            for rid in dict.fromkeys(sk["reward_ids"]):
+                if rid not in rewards:
+                    info = self.reward_table.get(rid) or {}
+                    for b in info.get("itemBundles") or info.get("rewardList") or []:
+                        iid = b.get("id") or b.get("itemId")
+                        count = b.get("count") or b.get("amount") or 1
+                        items[iid][rid] = items[iid].get(rid, 0) + count
+                rewards[rid].append(mid)
+        paths = {}
+        for series_key, missions in self.iter_series():
+            path = "/".join(self.series_path(series_key, missions))
+            for mid, _ in missions: paths[mid] = path
+        missions = {mid: {"name": self.master_db[mid].name if mid in self.master_db else "", "path": paths.get(mid)}
+                    for mid in self.skeleton}
+        names = {iid: self.resolve_item_name(iid) for iid in items}
+        return ItemIndex(dict(items), dict(rewards), missions, names)
+
+    def generate(self, output_root=OUTPUT_ROOT, incremental=True, formats=("markdown",)):
+        print("正在生成数据文档...")
+        with span("generate", locale=self.locale, output=output_root):
+            for fmt in formats:
+                with span(f"write:{fmt}", output=output_root):
+                    OUTPUT_BACKENDS[fmt]().write(self, output_root, incremental=incremental)
+        if INSTRUMENTS:
+            st = self.resolve_stats
+            INSTRUMENTS.gauge(f"resolve:{self.locale}", {"calls": st["hits"] + st["misses"], "index_hits": st["hits"],
+                                                        "index_misses": st["misses"], "fallbacks": st["fallbacks"]})
+        print(f"全部完成！输出目录: {output_root}")
+
+class ItemIndex:
+    """物品反向索引：items[物品ID][奖励ID] = 数量，rewards[奖励ID] = [任务ID]"""
+    def __init__(self, items, rewards, missions, names):
+        self.items = items
+        self.rewards = rewards
+        self.missions = missions
+        self.names = names
+
+    def sources(self, item_id):
+        """返回 [(任务ID, 奖励ID, 数量)]，按任务 ID 自然排序"""
+        out = [(mid, rid, count) for rid, count in self.items.get(item_id, {}).items()
+               for mid in self.rewards.get(rid, ())]
+        out.sort(key=lambda x: natural_keys(str(x[0])))
+        return out
+
+    def save(self, path):
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"items": self.items, "rewards": self.rewards, "missions": self.missions, "names": self.names},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        data = load_json(path)
+        return cls(data.get("items", {}), data.get("rewards", {}), data.get("missions", {}), data.get("names", {}))
+
+def item_index_path(output_root):
+    return f"{output_root}.items.json"
+
+class MarkdownBackend:
+    """按系列写出 Markdown 文件，通过清单增量同步输出目录"""
+    def write(self, app, output_root, incremental=True):
+        with span("render_all"): outputs = app.render_all()
+        if not incremental and os.path.exists(output_root): shutil.rmtree(output_root)
+        os.makedirs(output_root, exist_ok=True)
+        stats = sync_output_tree(output_root, outputs, app.writers)
+        print(f"写入 {stats['written']} 个文件，未变化 {stats['unchanged']} 个，删除 {stats['removed']} 个")
+
+class ZipBackend:
+    """把 Markdown 目录树整体写入单个压缩包 <输出目录>.zip，适合文件创建开销大的网络共享或受杀毒软件监控的目录
+
+    条目按路径排序并使用固定时间戳，相同数据生成的压缩包逐字节一致。
+    """
+    def write(self, app, output_root, incremental=True):
+        with span("render_all"): outputs = app.render_all()
+        zip_path = f"{output_root}.zip"
+        tmp_path = f"{zip_path}.tmp"
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            for rel_path in sorted(outputs):
+                info = zipfile.ZipInfo(f"{os.path.basename(output_root)}/{rel_path}", date_time=(1980, 1, 1, 0, 0, 0))
+                info.compress_type = zipfile.ZIP_DEFLATED
+                zf.writestr(info, outputs[rel_path].encode('utf-8'))
+        os.replace(tmp_path, zip_path)
+        record_output(zip_path)
+        print(f"写入压缩包: {zip_path}（{len(outputs)} 个文件）")
+
+class SQLiteBackend:
+    """把全部任务写入单个 SQLite 数据库 <输出目录>.sqlite，整体在一个事务内写入"""
+    SCHEMA = """
+        CREATE TABLE view_types (view_type INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE series (series_key TEXT PRIMARY KEY, view_type INTEGER, path TEXT);
+        CREATE TABLE missions (mission_id TEXT PRIMARY KEY, series_key TEXT, ord INTEGER,
+                               name TEXT, description TEXT, level TEXT, source TEXT);
+        CREATE TABLE rewards (mission_id TEXT, ord INTEGER, item_id TEXT, item_name TEXT, count INTEGER);
+        CREATE TABLE objectives (mission_id TEXT, ord INTEGER, text TEXT);
+        CREATE INDEX idx_missions_series ON missions(series_key);
+        CREATE INDEX idx_rewards_mission ON rewards(mission_id);
+        CREATE INDEX idx_rewards_item ON rewards(item_id);
+        CREATE INDEX idx_objectives_mission ON objectives(mission_id);
+    """
+
+    def write(self, app, output_root, incremental=True):
+        db_path = f"{output_root}.sqlite"
+        tmp_path = f"{db_path}.tmp"
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        series, missions, rewards, objectives = {}, [], [], []
+        for i, rec in enumerate(app.structured_missions()):
+            mid = rec["missionId"]
+            series[rec["series"]] = (rec["series"], rec["viewType"], rec["path"])
+            missions.append((mid, rec["series"], i, rec["name"], rec["desc"], str(rec["level"]), rec["source"]))
+            rewards.extend((mid, j, r["itemId"], r["name"], r["count"]) for j, r in enumerate(rec["rewards"]))
+            objectives.extend((mid, j, text) for j, text in enumerate(rec["objectives"]))
+
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(self.SCHEMA)
+            with conn:
+                conn.executemany("INSERT INTO view_types VALUES (?, ?)", app.classifier.view_types.items())
+                conn.executemany("INSERT INTO series VALUES (?, ?, ?)", series.values())
+                conn.executemany("INSERT OR REPLACE INTO missions VALUES (?, ?, ?, ?, ?, ?, ?)", missions)
+                conn.executemany("INSERT INTO rewards VALUES (?, ?, ?, ?, ?)", rewards)
+                conn.executemany("INSERT INTO objectives VALUES (?, ?, ?)", objectives)
+        finally: conn.close()
+        os.replace(tmp_path, db_path)
+        record_output(db_path)
+        print(f"写入 SQLite: {db_path}（{len(missions)} 个任务）")
+
+class JSONLBackend:
+    """每行一个任务的 JSON 流 <输出目录>.jsonl"""
+    def write(self, app, output_root, incremental=True):
+        out_path = f"{output_root}.jsonl"
+        tmp_path = f"{out_path}.tmp"
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+            lines = []
+            for rec in app.structured_missions():
+                lines.append(json.dumps(rec, ensure_ascii=False) + "\n")
+                count += 1
+                if len(lines) >= 1000:
+                    f.writelines(lines)
+                    lines.clear()
+            f.writelines(lines)
+        os.replace(tmp_path, out_path)
+        record_output(out_path)
+        print(f"写入 JSONL: {out_path}（{count} 个任务）")
+
+class SearchIndexBackend:
+    """生成全文检索索引 <输出目录>.search.sqlite（SQLite FTS5）
+
+    中文没有空格分词，优先使用 trigram 分词器以支持任意子串检索；
+    SQLite 版本过旧不支持 trigram 时退回 unicode61。
+    """
+    def write(self, app, output_root, incremental=True):
+        index_path = search_index_path(output_root)
+        tmp_path = f"{index_path}.tmp"
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        rows = [(rec["missionId"], rec["path"], rec["name"], rec["desc"],
+                 "\n".join(rec["objectives"]), "\n".join(r["name"] for r in rec["rewards"] if r["name"]))
+                for rec in app.structured_missions()]
+
+        conn = sqlite3.connect(tmp_path)
+        try:
+            tokenizer = "trigram"
+            try: conn.execute(f"CREATE VIRTUAL TABLE mission_fts USING fts5({SEARCH_COLUMNS}, tokenize='trigram')")
+            except sqlite3.OperationalError:
+                tokenizer = "unicode61"
+                conn.execute(f"CREATE VIRTUAL TABLE mission_fts USING fts5({SEARCH_COLUMNS})")
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            with conn:
+                conn.execute("INSERT INTO meta VALUES ('tokenizer', ?)", (tokenizer,))
+                conn.executemany("INSERT INTO mission_fts VALUES (?, ?, ?, ?, ?, ?)", rows)
+        except sqlite3.OperationalError as e:
+            conn.close()
+            os.remove(tmp_path)
+            print(f"✗ 当前 SQLite 不支持 FTS5，跳过检索索引: {e}")
+            return
+        conn.close()
+        os.replace(tmp_path, index_path)
+        record_output(index_path)
+        print(f"写入检索索引: {index_path}（{len(rows)} 个任务，分词器 {tokenizer}）")
+
+SEARCH_COLUMNS = "mission_id UNINDEXED, path UNINDEXED, name, desc, objectives, rewards"
+
+def search_index_path(output_root):
+    return f"{output_root}.search.sqlite"
+
+def search_missions(output_root, query, limit=50):
+    """在检索索引中查找包含 query 的任务，返回 [(任务 ID, 文件路径)]"""
+    conn = sqlite3.connect(f"file:{search_index_path(output_root)}?mode=ro", uri=True)
+    try:
+        tokenizer = conn.execute("SELECT value FROM meta WHERE key = 'tokenizer'").fetchone()[0]
+        if tokenizer == "trigram" and len(query) < 3:
+            # trigram 无法匹配少于三个字符的词，改为 LIKE 扫描
+            pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            sql = ("SELECT mission_id, path FROM mission_fts WHERE " +
+                   " OR ".join(f"{c} LIKE ? ESCAPE '\\'" for c in ("name", "desc", "objectives", "rewards")) +
+                   " LIMIT ?")
+            return conn.execute(sql, (pattern,) * 4 + (limit,)).fetchall()
+        phrase = '"' + query.replace('"', '""') + '"'
+        return conn.execute("SELECT mission_id, path FROM mission_fts WHERE mission_fts MATCH ? ORDER BY rank LIMIT ?",
+                            (phrase, limit)).fetchall()
+    finally: conn.close()
+
+class ItemIndexBackend:
+    """保存物品反向索引 <输出目录>.items.json，供 --item 查询"""
+    def write(self, app, output_root, incremental=True):
+        index = app.build_item_index()
+        index.save(item_index_path(output_root))
+        record_output(item_index_path(output_root))
+        print(f"写入物品索引: {item_index_path(output_root)}（{len(index.items)} 个物品）")
+
+class ItemPagesBackend:
+    """为每个物品生成“获取途径”页面，输出到 <输出目录>_Items"""
+    def write(self, app, output_root, incremental=True):
+        index = app.build_item_index()
+        pages_root = f"{output_root}_Items"
+        mission_root = os.path.relpath(output_root, pages_root).replace(os.sep, "/")
+        outputs = {}
+        for iid in sorted(index.items, key=lambda x: natural_keys(str(x))):
+            sources = index.sources(iid)
+            if not sources: continue
+            name = index.names.get(iid) or str(iid)
+            out = [f"# {name}\n\n- **物品ID**: {iid}\n\n**获取途径**:\n"]
+            for mid, rid, count in sources:
+                m = index.missions.get(mid) or {}
+                label = m.get("name") or mid
+                if m.get("path"): out.append(f"- [{label}](<{mission_root}/{m['path']}>) x{count}\n")
+                else: out.append(f"- {label}（{mid}）x{count}\n")
+            outputs[f"{sanitize_filename(str(iid))}_{sanitize_filename(name)}.md"] = "".join(out)
+        if not incremental and os.path.exists(pages_root): shutil.rmtree(pages_root)
+        os.makedirs(pages_root, exist_ok=True)
+        stats = sync_output_tree(pages_root, outputs, app.writers)
+        print(f"物品来源页面: 写入 {stats['written']} 个，未变化 {stats['unchanged']} 个，删除 {stats['removed']} 个")
+
+OUTPUT_BACKENDS = {
+    "markdown": MarkdownBackend,
+    "zip": ZipBackend,
+    "sqlite": SQLiteBackend,
+    "jsonl": JSONLBackend,
+    "search": SearchIndexBackend,
+    "items": ItemIndexBackend,
+    "item-pages": ItemPagesBackend,
+}
+
+def render_locale(payload, locale, output_root, incremental=True, cache_dir=None, stream_text=False, formats=("markdown",),
+                  instrument=False):
+    """instrument 为 True 时（子进程中）单独记录性能数据并随结果返回，由主进程合并"""
+    global INSTRUMENTS
+    if instrument: INSTRUMENTS = Instrumentation()
+    cache = TableCache(cache_dir) if cache_dir else None
+    app = WikiGeneratorClean.from_payload(payload, locale, cache=cache, stream_text=stream_text)
+    app.generate(output_root, incremental=incremental, formats=formats)
+    return locale, INSTRUMENTS.export() if instrument else None
+
+def generate_locales(app, locales, output_root=OUTPUT_ROOT, incremental=True, jobs=1, formats=("markdown",)):
+    """由同一份骨架并行渲染多个语言，每个语言输出到 <output_root>_<语言>"""
+    payload = app.locale_payload()
+    cache_dir = app.cache.cache_dir if app.cache else None
+    args = [(payload, loc, f"{output_root}_{loc}", incremental, cache_dir, app.stream_text, formats) for loc in locales]
+    if jobs > 1 and len(locales) > 1:
+        args = [a + (INSTRUMENTS is not None,) for a in args]
+        with ProcessPoolExecutor(max_workers=min(jobs, len(locales))) as pool:
+            for loc, recorded in pool.map(render_locale, *zip(*args)):
+                if recorded: INSTRUMENTS.merge(recorded)
+                print(f"[{loc}] 渲染完成")
+    else:
+        for a in args: render_locale(*a)
+
+class MissionWatcher:
+    """常驻监视数据目录，按依赖关系只重新渲染受影响的系列文件
+
+    依赖图：运行时资产 → 任务 → 系列文件；奖励 → 任务；物品 → 奖励 → 任务；
+    文本键 → 任务 / 物品。表格在内存中常驻，变化的表格重新加载后按条目比对。
+    formats 为 --format 选择的输出：Markdown 只重新渲染受影响的系列文件，
+    其余输出（压缩包、数据库、物品索引等）在有任务受影响时由对应后端整体重新写入。
+    """
+    def __init__(self, app, output_root=OUTPUT_ROOT, interval=1.0, formats=("markdown",)):
+        self.app = app
+        self.output_root = output_root
+        self.interval = interval
+        self.formats = formats
+        self.asset_dir = os.path.join(app.base_dir, RUNTIME_ASSET_SUBDIR)
+        self.table_paths = {k: v for k, v in app.files.items() if k != "i18n"}
+        self.table_paths["i18n"] = i18n_path(app.locale, app.base_dir)
+
+        self.mission_rows = defaultdict(list)
+        for info in iterate_data(app.tables['mission_data']):
+            if info.get("missionId"): self.mission_rows[info["missionId"]].append(info)
+        self.records = {rec["file"]: rec for rec in app.runtime_records}
+        self.mission_files = defaultdict(list)
+        for rec in app.runtime_records: self.mission_files[rec["missionId"]].append(rec["file"])
+
+        self.reward_missions = defaultdict(set)
+        self.item_rewards = defaultdict(set)
+        self.text_missions = defaultdict(set)
+        self.text_items = defaultdict(set)
+        for mid in app.skeleton: self._link_mission(mid)
+
+        self.series_missions = defaultdict(set)
+        self.mission_series = {}
+        self.series_paths = {}
+        for series_key, missions in app.iter_series():
+            self.series_paths[series_key] = "/".join(app.series_path(series_key, missions))
+            for mid, _ in missions:
+                self.series_missions[series_key].add(mid)
+                self.mission_series[mid] = series_key
+        self.snapshot = self.take_snapshot()
+
+    def _link_mission(self, mid):
+        app = self.app
+        sk = app.skeleton[mid]
+        rids = [info.get("missionRewardId") or info.get("rewardId") for info in self.mission_rows.get(mid, ())]
+        rids += [self.records[f]["rewardId"] for f in self.mission_files.get(mid, ())]
+        for rid in rids:
+            if not rid: continue
+            self.reward_missions[rid].add(mid)
+            info = app.reward_table.get(rid) or {}
+            for b in info.get("itemBundles") or info.get("rewardList") or []:
+                iid = b.get("id") or b.get("itemId")
+                self.item_rewards[iid].add(rid)
+                if iid in app.item_table: self.text_items[text_key(app.item_table[iid].get("name"))].add(iid)
+        for key, _ in sk["name"]: self.text_missions[key].add(mid)
+        self.text_missions[sk["desc"]].add(mid)
+        for key in sk["objectives"]: self.text_missions[key].add(mid)
+
+    def _missions_of_items(self, iids):
+        return {mid for iid in iids for rid in self.item_rewards.get(iid, ()) for mid in self.reward_missions.get(rid, ())}
+
+    def take_snapshot(self):
+        snapshot = {}
+        paths = list(self.table_paths.values()) + glob.glob(os.path.join(self.asset_dir, "*.json"))
+        for p in paths:
+            try: st = os.stat(p)
+            except OSError: continue
+            snapshot[p] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def run(self):
+        print(f"正在监视 {self.app.base_dir} 的变化（每 {self.interval} 秒检查一次），按 Ctrl+C 退出")
+        try:
+            while True:
+                time.sleep(self.interval)
+                self.poll()
+        except KeyboardInterrupt: print("已停止监视")
+
+    def poll(self):
+        snapshot = self.take_snapshot()
+        changed = {p for p in snapshot.keys() | self.snapshot.keys() if snapshot.get(p) != self.snapshot.get(p)}
+        if not changed: return None
+        affected, retry = self.apply_changes(changed)
+        for p in retry:
+            if p in self.snapshot: snapshot[p] = self.snapshot[p]
+            else: snapshot.pop(p, None)
+        self.snapshot = snapshot
+        with span("watch:rerender", missions=len(affected)): return self.rerender(affected)
+
+    def _reload_table(self, name):
+        app = self.app
+        keys = None
+        if app.stream_text and name in TEXT_TABLES:
+            keys = app.text_keys if name == "text_table" else app.i18n_keys
+        table = load_table(self.table_paths[name], app.cache, keys)
+        if not table and app.tables.get(name):
+            print(f"⚠️ 读取 {self.table_paths[name]} 失败，可能仍在写入，稍后重试")
+            return None
+        return table
+
+    def apply_changes(self, changed):
+        """重新加载变化的输入并更新骨架，返回 (受影响的任务, 需要下次重试的路径)"""
+        app = self.app
+        affected, retry = set(), set()
+        names = {name for name, p in self.table_paths.items() if p in changed}
+
+        for name in ("mission_data", "reward", "item"):
+            if name not in names: continue
+            table = self._reload_table(name)
+            if table is None:
+                retry.add(self.table_paths[name])
+                continue
+            old, app.tables[name] = app.tables[name], table
+            if name == "mission_data":
+                rows = defaultdict(list)
+                for info in iterate_data(table):
+                    if info.get("missionId"): rows[info["missionId"]].append(info)
+                affected |= {mid for mid in rows.keys() | self.mission_rows.keys() if rows.get(mid) != self.mission_rows.get(mid)}
+                self.mission_rows = rows
+            elif name == "reward":
+                app.reward_table = table
+                affected |= {mid for rid in table.keys() | old.keys() if table.get(rid) != old.get(rid)
+                             for mid in self.reward_missions.get(rid, ())}
+            else:
+                app.item_table = table
+                iids = {iid for iid in table.keys() | old.keys() if table.get(iid) != old.get(iid)}
+                for iid in iids: app.item_names.pop(iid, None)
+                affected |= self._missions_of_items(iids)
+
+        for path in changed:
+            if os.path.dirname(path) != self.asset_dir: continue
+            fname = os.path.basename(path)
+            old_rec = self.records.pop(fname, None)
+            new_rec = extract_runtime_record(path) if os.path.exists(path) else None
+            if new_rec: self.records[fname] = new_rec
+            for rec in (old_rec, new_rec):
+                if not rec: continue
+                affected.add(rec["missionId"])
+                files = [f for f in self.mission_files[rec["missionId"]] if f != fname]
+                if rec is new_rec: files = sorted(files + [fname])
+                self.mission_files[rec["missionId"]] = files
+
+        for mid in affected:
+            entry = app.new_skeleton_entry()
+            for info in self.mission_rows.get(mid, ()): app.apply_table_row(entry, info)
+            for f in self.mission_files.get(mid, ()): app.apply_runtime_record(entry, self.records[f])
+            if self.mission_rows.get(mid) or self.mission_files.get(mid):
+                app.skeleton[mid] = entry
+                self._link_mission(mid)
+            else: app.skeleton.pop(mid, None)
+
+        text_changed = names & set(TEXT_TABLES)
+        new_keys = {k for k in self.text_missions.keys() | self.text_items.keys() if k} - app.text_keys
+        if new_keys:
+            app.text_keys |= new_keys
+            if app.stream_text: text_changed |= set(TEXT_TABLES)
+        if text_changed:
+            old_index = app.text_index
+            for name in TEXT_TABLES:
+                if name not in text_changed: continue
+                table = self._reload_table(name)
+                if table is None:
+                    retry.add(self.table_paths[name])
+                    continue
+                app.tables[name] = table
+            app.text_table = app.tables['text_table']
+            app.i18n_keys = app.collect_i18n_keys()
+            if app.stream_text and "i18n" not in retry:
+                app.i18n = app.tables['i18n'] = load_table(self.table_paths["i18n"], app.cache, app.i18n_keys)
+            else: app.i18n = app.tables['i18n']
+            app.build_text_index(app.text_keys)
+            app.item_names = {}
+            keys = {k for k in app.text_index if old_index.get(k, _MISSING) != app.text_index[k]}
+            affected |= {mid for k in keys for mid in self.text_missions.get(k, ())}
+            affected |= self._missions_of_items({iid for k in keys for iid in self.text_items.get(k, ())})
+        return affected, retry
+
+    def rerender(self, affected):
+        app = self.app
+        series_keys = set()
+        for mid in affected:
+            old_series = self.mission_series.pop(mid, None)
+            if old_series:
+                series_keys.add(old_series)
+                self.series_missions[old_series].discard(mid)
+            if mid not in app.skeleton:
+                app.master_db.pop(mid, None)
+                continue
+            data = app.master_db[mid] = app.resolve_mission(mid, app.skeleton[mid])
+            if not data.has_content(): continue
+            series_key = app.get_series_key(mid)
+            self.series_missions[series_key].add(mid)
+            self.mission_series[mid] = series_key
+            series_keys.add(series_key)
+
+        markdown = "markdown" in self.formats
+        outputs, stale = {}, set()
+        for series_key in series_keys:
+            old_path = self.series_paths.pop(series_key, None)
+            mids = self.series_missions.get(series_key)
+            if mids:
+                missions = sorted(((mid, app.master_db[mid]) for mid in mids), key=lambda x: natural_keys(x[0]))
+                path = "/".join(app.series_path(series_key, missions))
+                if markdown: outputs[path] = app.render_series(series_key, missions)
+                self.series_paths[series_key] = path
+            else: self.series_missions.pop(series_key, None)
+            if old_path and old_path != self.series_paths.get(series_key): stale.add(old_path)
+        print(f"{time.strftime('%H:%M:%S')} 受影响任务 {len(affected)} 个，涉及系列 {len(series_keys)} 个")
+        stats = None
+        if markdown:
+            stats = patch_output_tree(self.output_root, outputs, stale, app.writers)
+            print(f"重新渲染系列文件：写入 {stats['written']}，未变化 {stats['unchanged']}，删除 {stats['removed']}")
+        if affected:
+            for fmt in self.formats:
+                if fmt == "markdown": continue
+                with span(f"write:{fmt}", output=self.output_root):
+                    OUTPUT_BACKENDS[fmt]().write(app, self.output_root)
+        return stats
+
+DIFF_FIELDS = {"name": "名称", "desc": "描述", "level": "关卡", "rewards": "奖励", "objectives": "目标"}
+
+def mission_fingerprint(data, rewards):
+    """按渲染时的规范形式（奖励去重排序、目标去重）计算各字段的哈希，rewards 为格式化后的奖励"""
+    canonical = {
+        "name": data.name, "desc": data.desc, "level": data.level,
+        "rewards": sorted(set(rewards)), "objectives": list(dict.fromkeys(data.objectives)),
+    }
+    return {f: hashlib.blake2b(json.dumps(v, ensure_ascii=False).encode('utf-8'), digest_size=8).hexdigest()
+            for f, v in canonical.items()}
+
+def root_fingerprints(base_dir, cache=None, stream_text=False, jobs=1, locale=DEFAULT_LOCALE):
+    """计算数据目录中每个任务的内容指纹；输入文件未变化时直接复用缓存"""
+    signature = data_signature(base_dir, locale)
+    name = "fingerprints-" + hashlib.sha1(f"{os.path.abspath(base_dir)}\0{locale}".encode('utf-8')).hexdigest()
+    if cache:
+        cached = cache.load_artifact(name, signature)
+        if cached is not None:
+            print(f"复用缓存的任务指纹: {base_dir}")
+            return cached
+    app = WikiGeneratorClean(cache=cache, stream_text=stream_text, jobs=jobs, locale=locale, base_dir=base_dir)
     app.build_skeleton()
-    app.generate()
+    fingerprints = {mid: {"name": data.name, "fields": mission_fingerprint(data, app.format_rewards(data))}
+                    for mid, data in app.master_db.items()}
+    if cache: cache.store_artifact(name, signature, fingerprints)
+    return fingerprints
+
+def diff_fingerprints(old, new):
+    added = [{"missionId": mid, "name": new[mid]["name"]} for mid in new if mid not in old]
+    removed = [{"missionId": mid, "name": old[mid]["name"]} for mid in old if mid not in new]
+    changed = []
+    for mid, fp in new.items():
+        if mid not in old or old[mid]["fields"] == fp["fields"]: continue
+        fields = [f for f in DIFF_FIELDS if old[mid]["fields"].get(f) != fp["fields"].get(f)]
+        changed.append({"missionId": mid, "name": fp["name"], "oldName": old[mid]["name"], "fields": fields})
+    for items in (added, removed, changed): items.sort(key=lambda x: natural_keys(x["missionId"]))
+    return {"added": added, "removed": removed, "changed": changed}
+
+def render_diff_markdown(report):
+    out = ["# 任务数据差异\n\n",
+           f"- 旧数据: `{report['old']}`\n- 新数据: `{report['new']}`\n",
+           f"- 新增 {len(report['added'])} 个，删除 {len(report['removed'])} 个，变更 {len(report['changed'])} 个\n"]
+    for title, key in (("新增任务", "added"), ("删除任务", "removed")):
+        if not report[key]: continue
+        out.append(f"\n## {title}\n")
+        for m in report[key]: out.append(f"- `{m['missionId']}` {m['name'] or '无'}\n")
+    if report["changed"]:
+        out.append("\n## 变更任务\n")
+        for m in report["changed"]:
+            fields = "、".join(DIFF_FIELDS[f] for f in m["fields"])
+            out.append(f"- `{m['missionId']}` {m['name'] or '无'}（{fields}）\n")
+    return "".join(out)
+
+def diff_roots(old_root, new_root, report_path, cache=None, stream_text=False, jobs=1, locale=DEFAULT_LOCALE):
+    old = root_fingerprints(old_root, cache, stream_text, jobs, locale)
+    new = root_fingerprints(new_root, cache, stream_text, jobs, locale)
+    report = {"old": old_root, "new": new_root, "locale": locale, **diff_fingerprints(old, new)}
+    with open(f"{report_path}.json", 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    with open(f"{report_path}.md", 'w', encoding='utf-8') as f:
+        f.write(render_diff_markdown(report))
+    print(f"新增 {len(report['added'])} 个，删除 {len(report['removed'])} 个，变更 {len(report['changed'])} 个")
+    print(f"差异报告: {report_path}.json / {report_path}.md")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="任务数据文档生成工具")
+    parser.add_argument('--no-cache', action='store_true', help='不使用表格缓存，每次重新解析 JSON')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='表格缓存目录')
+    parser.add_argument('--stream-text', action='store_true', help='流式加载文本表，仅保留任务实际引用的文本键')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='并行解析 MissionRuntimeAsset 的进程数')
+    parser.add_argument('--output', '-o', default=OUTPUT_ROOT, help='输出目录')
+    parser.add_argument('--full', action='store_true', help='清空输出目录后完整重写，不做增量比对')
+    parser.add_argument('--locales', default=None, help='多语言模式，逗号分隔的语言列表，如 CN,EN,JP,KR')
+    parser.add_argument('--writers', type=int, default=WRITE_WORKERS, help=f'写入 Markdown 文件的线程数，1 为同步写入，默认 {WRITE_WORKERS}')
+    parser.add_argument('--series-rules', default=None, help='系列分类规则配置文件（JSON 格式）')
+    parser.add_argument('--profile', default=None, metavar='PATH', help='记录各阶段耗时与计数器，写入 JSON 报告')
+    parser.add_argument('--trace', default=None, metavar='PATH', help='记录各阶段耗时，写入 Chrome trace 文件（chrome://tracing）')
+    parser.add_argument('--format', default='markdown',
+                        help=f'输出格式，逗号分隔，可选: {", ".join(OUTPUT_BACKENDS)}')
+    parser.add_argument('--diff', nargs=2, metavar=('OLD_ROOT', 'NEW_ROOT'), default=None,
+                        help='比较两个 endfielddata 目录，报告新增、删除与变更的任务')
+    parser.add_argument('--diff-report', default='mission_diff', help='差异报告路径（不含扩展名），生成 .json 与 .md')
+    parser.add_argument('--watch', action='store_true', help='生成后常驻监视数据目录，变化时按 --format 更新受影响的输出')
+    parser.add_argument('--interval', type=float, default=1.0, help='监视模式的检查间隔（秒）')
+    parser.add_argument('--search', default=None, metavar='QUERY', help='在已生成的检索索引中查找任务并退出')
+    parser.add_argument('--limit', type=int, default=50, help='检索结果数量上限')
+    parser.add_argument('--item', default=None, metavar='ITEM_ID', help='在物品索引中查询可获得该物品的任务并退出')
+    args = parser.parse_args()
+
+    if args.item is not None:
+        if not os.path.exists(item_index_path(args.output)):
+            print(f"⚠️ 未找到物品索引: {item_index_path(args.output)}，请先使用 --format items 生成")
+            return
+        index = ItemIndex.load(item_index_path(args.output))
+        sources = index.sources(args.item)
+        print(f"{index.names.get(args.item) or args.item}（{args.item}）")
+        for mid, rid, count in sources:
+            m = index.missions.get(mid) or {}
+            print(f"{mid}\t{m.get('name') or ''}\t{rid}\tx{count}\t{m.get('path') or ''}")
+        print(f"共 {len(sources)} 个任务")
+        return
+
+    if args.search is not None:
+        if not os.path.exists(search_index_path(args.output)):
+            print(f"⚠️ 未找到检索索引: {search_index_path(args.output)}，请先使用 --format search 生成")
+            return
+        results = search_missions(args.output, args.search, args.limit)
+        for mid, path in results: print(f"{mid}\t{os.path.join(args.output, path)}")
+        print(f"共 {len(results)} 个结果")
+        return
+
+    formats = [fmt.strip() for fmt in args.format.split(",") if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in OUTPUT_BACKENDS]
+    if unknown: parser.error(f"未知的输出格式: {', '.join(unknown)}")
+    if args.writers < 1: parser.error("--writers 必须大于等于 1")
+    if args.watch and args.locales: parser.error("--watch 不支持多语言模式 --locales")
+    if args.watch and args.diff: parser.error("--watch 不能与 --diff 同时使用")
+
+    cache = None if args.no_cache else TableCache(args.cache_dir)
+    jobs = max(1, args.jobs)
+    classifier = SeriesClassifier.from_config(args.series_rules) if args.series_rules else None
+    instruments = enable_instrumentation() if args.profile or args.trace else None
+    try: run_generation(args, cache, jobs, formats, classifier)
+    finally:
+        if instruments: instruments.save(args.profile, args.trace)
+
+def run_generation(args, cache, jobs, formats, classifier):
+    if args.diff:
+        diff_roots(args.diff[0], args.diff[1], args.diff_report, cache=cache,
+                   stream_text=args.stream_text, jobs=jobs)
+        return
+    if args.locales:
+        locales = [loc.strip() for loc in args.locales.split(",") if loc.strip()]
+        app = WikiGeneratorClean(cache=cache, stream_text=args.stream_text, jobs=jobs, locale=None, classifier=classifier)
+        app.writers = args.writers
+        app.build_skeleton()
+        generate_locales(app, locales, args.output, incremental=not args.full, jobs=jobs, formats=formats)
+        return
+
+    app = WikiGeneratorClean(cache=cache, stream_text=args.stream_text, jobs=jobs, classifier=classifier)
+    app.writers = args.writers
+    app.build_skeleton()
+    app.generate(args.output, incremental=not args.full, formats=formats)
+    if args.watch: MissionWatcher(app, args.output, args.interval, formats).run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成 endfielddata 数据生成器
+
+生成与 mission.py 读取格式一致的 TableCfg 表与 MissionRuntimeAsset 文件，
+用于在没有真实解包数据时测试与测量性能。
+
+用法：
+    python synth_data.py endfielddata --missions 20000 --texts 50000 --rewards 3
+"""
+
+import os
+import json
+import random
+import argparse
+
+import mission
+
+# 各前缀的任务 ID 形式，与真实数据中的系列划分方式一致
+ID_SHAPES = [
+    ("e", "{p}{s}m{n}_{i}"),
+    ("m", "{p}{s}_{i}"),
+    ("c", "{p}{s:02d}_{i}"),
+    ("f", "{p}{s}_{i}"),
+    ("sm", "{p}{s}_{i}"),
+    ("gm", "{p}{s}_{i}"),
+    ("a", "{p}{s}m{n}_{i}"),
+    ("dm", "{p}{s}m{n}_{i}"),
+    ("db", "{p}{s}m{n}_{i}"),
+    ("hidden", "{p}{s}_{i}"),
+]
+
+
+def dump(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+
+TEXT_LABELS = {"name": "任务", "desc": "描述", "obj": "目标", "itemname": "物品", "filler": "文本"}
+
+
+def text_value(rng, key, locale):
+    kind, _, suffix = key.partition("_")
+    if locale == mission.DEFAULT_LOCALE: body = f"{TEXT_LABELS[kind]}{suffix}"
+    else: body = f"{locale} {kind} {suffix}"
+    if kind in ("desc", "obj") and rng.random() < 0.3: body += f" <@qu.key>{TEXT_LABELS['obj']}{rng.randrange(97)}</>"
+    return body
+
+
+def generate_dataset(root, missions=5000, texts=None, rewards=3, items=None, objectives=2,
+                     runtime_ratio=0.3, series_size=20, locales=(mission.DEFAULT_LOCALE,), seed=0):
+    """在 root 下写入合成数据，返回各表的条目数
+
+    missions     任务数量
+    texts        i18n 表的总条目数（不足时以无关文本填充，模拟真实表中大量未引用的文本）
+    rewards      每个奖励包含的物品种类数
+    items        物品表大小，默认 missions // 10
+    runtime_ratio 同时拥有 MissionRuntimeAsset 文件的任务比例
+    """
+    rng = random.Random(seed)
+    items = items or max(10, missions // 10)
+    locales = list(locales)
+
+    mission_rows = []
+    text_table = {}
+    reward_table = {}
+    item_table = {f"item_{i}": {"name": {"id": f"itemname_{i}"}} for i in range(items)}
+    runtime = []
+    keys = [f"itemname_{i}" for i in range(items)]
+
+    for i in range(missions):
+        prefix, shape = rng.choice(ID_SHAPES)
+        mid = shape.format(p=prefix, s=i // series_size, n=i % series_size, i=i)
+        rid = f"reward_{i}"
+        reward_table[rid] = {"itemBundles": [
+            {"id": f"item_{rng.randrange(items)}", "count": rng.choice((1, 2, 5, 10, 100, 2000))}
+            for _ in range(rewards)]}
+        quest = {f"{mid}_q{q}": {"objectiveList": [{"description": {"id": f"obj_{i}_{q}_{k}"}} for k in range(objectives)]}
+                 for q in range(1 if objectives else 0)}
+        keys += [f"name_{i}", f"desc_{i}"] + [f"obj_{i}_0_{k}" for k in range(objectives)]
+        text_table[f"tk_desc_{i}"] = {"id": f"desc_{i}"}
+        mission_rows.append({"missionId": mid, "missionName": {"id": f"name_{i}"},
+                             "missionDesc": {"id": f"tk_desc_{i}"}, "missionRewardId": rid, "questDic": quest})
+        if rng.random() < runtime_ratio:
+            runtime.append((mid, {"missionId": mid, "missionName": {"id": f"name_{i}"},
+                                  "missionDescription": {"id": f"desc_{i}"}, "levelId": f"lv_{rng.randrange(200)}",
+                                  "rewardId": rid, "questDic": quest}))
+
+    filler = max(0, (texts or 0) - len(keys))
+    keys += [f"filler_{i}" for i in range(filler)]
+
+    dump(os.path.join(root, mission.TABLE_FILES["mission_data"]), mission_rows)
+    dump(os.path.join(root, mission.TABLE_FILES["text_table"]), text_table)
+    dump(os.path.join(root, mission.TABLE_FILES["reward"]), reward_table)
+    dump(os.path.join(root, mission.TABLE_FILES["item"]), item_table)
+    for locale in locales:
+        text_rng = random.Random(f"{seed}-{locale}")
+        i18n = {key: text_value(text_rng, key, locale) for key in keys}
+        dump(mission.i18n_path(locale, root), i18n)
+    asset_dir = os.path.join(root, mission.RUNTIME_ASSET_SUBDIR)
+    os.makedirs(asset_dir, exist_ok=True)
+    for mid, data in runtime: dump(os.path.join(asset_dir, f"{mid}.json"), data)
+
+    return {"missions": missions, "texts": len(keys), "reward_items": rewards, "items": items,
+            "runtime_assets": len(runtime), "locales": locales}
+
+
+def add_arguments(parser):
+    parser.add_argument('--missions', type=int, default=5000, help='任务数量')
+    parser.add_argument('--texts', type=int, default=None, help='i18n 表总条目数，默认只包含被引用的文本')
+    parser.add_argument('--rewards', type=int, default=3, help='每个奖励包含的物品种类数')
+    parser.add_argument('--items', type=int, default=None, help='物品表大小，默认为任务数量的 1/10')
+    parser.add_argument('--objectives', type=int, default=2, help='每个任务的目标数量')
+    parser.add_argument('--runtime-ratio', type=float, default=0.3, help='拥有 MissionRuntimeAsset 文件的任务比例')
+    parser.add_argument('--locales', default=mission.DEFAULT_LOCALE, help='生成的语言，逗号分隔')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+
+
+def dataset_options(args):
+    return {
+        "missions": args.missions, "texts": args.texts, "rewards": args.rewards, "items": args.items,
+        "objectives": args.objectives, "runtime_ratio": args.runtime_ratio, "seed": args.seed,
+        "locales": [loc.strip() for loc in args.locales.split(",") if loc.strip()],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成 endfielddata 数据")
+    parser.add_argument('root', help='输出目录，如 endfielddata')
+    add_arguments(parser)
+    args = parser.parse_args()
+    stats = generate_dataset(args.root, **dataset_options(args))
+    print(f"已生成 {stats['missions']} 个任务、{stats['texts']} 条文本、{stats['runtime_assets']} 个运行时资产: {args.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+skill_composer.py 基准测试
+
+用法：
+    python bench_composer.py downscale [--base base --skill skill] [--images 200]
+    python bench_composer.py batch [--base base --skill skill] [--images 200] [--batch 64]
+    python bench_composer.py atlas [--base base --skill skill] [--images 200] [--atlas-size 2048]
+    python bench_composer.py png [--base base --skill skill] [--images 200] [--colors 256]
+"""
+
+import io
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw, ImageChops
+
+import skill_composer
+
+try:
+    import numpy as np
+except ImportError:  # 仅 batch 基准测试需要 numpy
+    np = None
+
+
+def div255(values):
+    """Pillow 的 DIV255：带舍入的除以 255"""
+    tmp = values + 128
+    return ((tmp >> 8) + tmp) >> 8
+
+
+class BatchCompositor(skill_composer.ScaledCompositor):
+    """批量合成：按 (底图, 缩放比例, 技能图片尺寸) 分组，把整组缩放后的技能图片堆叠为一个 NumPy 数组，
+    一次完成透明度混合
+
+    技能图片的重采样仍由 Pillow 逐张完成；混合按 Pillow 带蒙版粘贴的整数运算实现，
+    结果与 ScaledCompositor 逐像素一致。需要 numpy。
+    技能图片逐张重采样占合成时间的大部分，实测并不比 ScaledCompositor 快，因此只用于 batch 基准测试。
+    """
+
+    def __init__(self, size=skill_composer.OUTPUT_SIZE):
+        if np is None:
+            raise RuntimeError("批量合成需要 numpy，请先安装: pip install numpy")
+        super().__init__(size)
+
+    def composite_batch(self, jobs):
+        """jobs 为 [(底图键, 底图, 技能图片, 缩放比例)]，按输入顺序返回合成结果
+
+        某个任务合成失败时，对应位置为异常对象。
+        """
+        results = [None] * len(jobs)
+        groups = {}
+        for i, (key, base_img, skill_img, scale) in enumerate(jobs):
+            groups.setdefault((key, scale, skill_img.size), []).append(i)
+        for (key, scale, _), indexes in groups.items():
+            base_img = jobs[indexes[0]][1]
+            skills = [jobs[i][2] for i in indexes]
+            try:
+                images = self.composite_group(base_img, skills, scale, key)
+            except Exception:
+                # 整组失败时逐个合成，得到每个任务各自的错误
+                images = []
+                for skill_img in skills:
+                    try:
+                        images.append(self.composite(base_img, skill_img, scale, key))
+                    except Exception as e:
+                        images.append(e)
+            for i, img in zip(indexes, images):
+                results[i] = img
+        return results
+
+    def composite_group(self, base_img, skills, scale=1.0, key=None):
+        """把尺寸相同的一组技能图片合成到同一底图上"""
+        if base_img.mode not in ('RGB', 'RGBA'):
+            return [skill_composer.composite_full(base_img, skill_img, scale=scale).resize(self.size, Image.Resampling.LANCZOS)
+                    for skill_img in skills]
+        base = self.scaled_base(base_img, key)
+        out = np.repeat(np.asarray(base)[None], len(skills), axis=0)
+        placement = self.placement(base_img.size, skills[0].size, scale)
+        if placement is not None:
+            x0, y0, x1, y1 = placement[0]
+            piece = np.stack([
+                np.asarray(self.scaled_piece(s if s.mode == 'RGBA' else s.convert('RGBA'), placement))
+                for s in skills
+            ]).astype(np.uint16)
+            # 以下中间值都不超过 255 * 255 + 255，uint16 即可容纳
+            region = out[:, y0:y1, x0:x1].astype(np.uint16)
+            mask = piece[..., 3:4]
+            blended = div255(region * (255 - mask) + piece[..., :region.shape[-1]] * mask)
+            if base.mode == 'RGBA':
+                # 透明度按 a + b - ab 合成，与 ScaledCompositor 相同
+                blended[..., 3] = 255 - (255 - piece[..., 3]) * (255 - region[..., 3]) // 255
+            out[:, y0:y1, x0:x1] = blended
+        return [Image.fromarray(o, base.mode) for o in out]
+
+    def encode_batch(self, jobs, png=None):
+        """与 composite_batch 相同，但返回按 PngEncoder 编码后的字节"""
+        png = png or skill_composer.PngEncoder()
+        return [img if isinstance(img, Exception) else png.encode(img) for img in self.composite_batch(jobs)]
+
+
+def synthetic_images(templates=5, skills=40, seed=0):
+    """生成与真实素材尺寸相近的底图模板（512x512）与技能图片（256x256，带抗锯齿边缘的透明图形）"""
+    rng = random.Random(seed)
+    bases = {}
+    for i in range(templates):
+        img = Image.new('RGBA', (512, 512), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(img)
+        draw.ellipse((16, 16, 496, 496), fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256), 255))
+        draw.ellipse((64, 64, 448, 448), outline=(255, 255, 255, 200), width=12)
+        bases[f"模板{i}.png"] = img
+    skill_images = {}
+    for i in range(skills):
+        # 以 4 倍尺寸绘制后缩小，得到与真实图标相近的柔和边缘
+        big = Image.new('RGBA', (1024, 1024), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(big)
+        for _ in range(3):
+            points = [(rng.randrange(100, 924), rng.randrange(100, 924)) for _ in range(5)]
+            draw.polygon(points, fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256), 255))
+        skill_images[f"技能{i}.png"] = big.resize((256, 256), Image.Resampling.LANCZOS)
+    return bases, skill_images
+
+
+def folder_images(folder):
+    images = {}
+    for name in sorted(os.listdir(folder)):
+        if os.path.splitext(name.lower())[1] not in ('.png', '.jpg', '.jpeg', '.bmp'):
+            continue
+        img = Image.open(os.path.join(folder, name))
+        img.load()
+        images[name] = img
+    return images
+
+
+def load_inputs(args):
+    if args.base and args.skill:
+        return folder_images(args.base), folder_images(args.skill)
+    return synthetic_images(seed=args.seed)
+
+
+def make_jobs(bases, skills, count, seed=0):
+    """随机组合 (底图, 技能图片)，与实际批量中多数技能共用少量模板的情况一致"""
+    rng = random.Random(seed)
+    base_names, skill_names = sorted(bases), sorted(skills)
+    return [(rng.choice(base_names), rng.choice(skill_names)) for _ in range(count)]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def mean_pixel_delta(a, b):
+    diff = ImageChops.difference(a, b)
+    hist = diff.histogram()
+    total = sum(value * (i % 256) for i, value in enumerate(hist))
+    return total / (a.width * a.height * len(a.getbands()))
+
+
+def bench_downscale(args):
+    bases, skills = load_inputs(args)
+    jobs = make_jobs(bases, skills, args.images, seed=args.seed)
+
+    legacy, legacy_time = timed(lambda: [skill_composer.composite_images(bases[b], skills[s], scale=args.scale)
+                                         for b, s in jobs])
+    compositor = skill_composer.ScaledCompositor()
+    fast, fast_time = timed(lambda: [compositor.composite(bases[b], skills[s], scale=args.scale, key=b)
+                                     for b, s in jobs])
+
+    deltas = [skill_composer.max_pixel_delta(a, b) for a, b in zip(legacy, fast)]
+    means = [mean_pixel_delta(a, b) for a, b in zip(legacy, fast)]
+    result = {
+        "images": len(jobs),
+        "templates": len(bases),
+        "scale": args.scale,
+        "legacy_seconds": round(legacy_time, 4),
+        "fast_seconds": round(fast_time, 4),
+        "legacy_images_per_second": round(len(jobs) / legacy_time, 1),
+        "fast_images_per_second": round(len(jobs) / fast_time, 1),
+        "speedup": round(legacy_time / fast_time, 2),
+        "max_pixel_delta": max(deltas),
+        "mean_pixel_delta": round(sum(means) / len(means), 3),
+    }
+    print(f"图片数量: {len(jobs)}（底图模板 {len(bases)} 个，缩放比例 {args.scale}）")
+    print(f"原流程（全尺寸合成后缩放）: {legacy_time:.3f}s，{result['legacy_images_per_second']} 张/秒")
+    print(f"先缩放后合成: {fast_time:.3f}s，{result['fast_images_per_second']} 张/秒（{result['speedup']}x）")
+    print(f"像素差异: 最大 {result['max_pixel_delta']}，平均 {result['mean_pixel_delta']}（0-255）")
+    if args.max_delta is not None and result['max_pixel_delta'] > args.max_delta:
+        raise SystemExit(f"最大像素差异 {result['max_pixel_delta']} 超过阈值 {args.max_delta}")
+    return result
+
+
+def bench_batch(args):
+    bases, skills = load_inputs(args)
+    jobs = make_jobs(bases, skills, args.images, seed=args.seed)
+
+    legacy, legacy_time = timed(lambda: [skill_composer.composite_images(bases[b], skills[s], scale=args.scale)
+                                         for b, s in jobs])
+    compositor = skill_composer.ScaledCompositor()
+    fast, fast_time = timed(lambda: [compositor.composite(bases[b], skills[s], scale=args.scale, key=b)
+                                     for b, s in jobs])
+    batcher = BatchCompositor()
+    batch_jobs = [(b, bases[b], skills[s], args.scale) for b, s in jobs]
+    chunks = [batch_jobs[i:i + args.batch] for i in range(0, len(batch_jobs), args.batch)]
+    batched, batch_time = timed(lambda: [img for chunk in chunks for img in batcher.composite_batch(chunk)])
+    _, encode_time = timed(lambda: [batcher.encode_batch(chunk) for chunk in chunks])
+
+    errors = [img for img in batched if isinstance(img, Exception)]
+    if errors:
+        raise SystemExit(f"批量合成失败: {errors[0]}")
+    deltas = [skill_composer.max_pixel_delta(a, b) for a, b in zip(fast, batched)]
+    result = {
+        "images": len(jobs),
+        "templates": len(bases),
+        "scale": args.scale,
+        "batch": args.batch,
+        "legacy_images_per_second": round(len(jobs) / legacy_time, 1),
+        "fast_images_per_second": round(len(jobs) / fast_time, 1),
+        "batch_images_per_second": round(len(jobs) / batch_time, 1),
+        "batch_encode_images_per_second": round(len(jobs) / encode_time, 1),
+        "batch_speedup_vs_legacy": round(legacy_time / batch_time, 2),
+        "batch_speedup_vs_fast": round(fast_time / batch_time, 2),
+        "max_pixel_delta_vs_fast": max(deltas),
+    }
+    print(f"图片数量: {len(jobs)}（底图模板 {len(bases)} 个，缩放比例 {args.scale}，每批 {args.batch} 张）")
+    print(f"原流程 composite_images: {result['legacy_images_per_second']} 张/秒")
+    print(f"ScaledCompositor: {result['fast_images_per_second']} 张/秒")
+    print(f"BatchCompositor: {result['batch_images_per_second']} 张/秒"
+          f"（原流程的 {result['batch_speedup_vs_legacy']}x，ScaledCompositor 的 {result['batch_speedup_vs_fast']}x）")
+    print(f"BatchCompositor 含 PNG 编码: {result['batch_encode_images_per_second']} 张/秒")
+    print(f"与 ScaledCompositor 的最大像素差异: {result['max_pixel_delta_vs_fast']}")
+    return result
+
+
+def folder_bytes(folder):
+    return sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder))
+
+
+def bench_atlas(args):
+    bases, skills = load_inputs(args)
+    jobs = make_jobs(bases, skills, args.images, seed=args.seed)
+    compositor = skill_composer.ScaledCompositor()
+    # 同一组合只输出一次，与实际输出一致
+    names = {f"{os.path.splitext(b)[0]}_{os.path.splitext(s)[0]}.png": (b, s) for b, s in jobs}
+    images = {name: compositor.composite(bases[b], skills[s], scale=args.scale, key=b) for name, (b, s) in names.items()}
+
+    root = tempfile.mkdtemp(prefix='bench_atlas_')
+    try:
+        files_dir, atlas_dir = os.path.join(root, 'files'), os.path.join(root, 'atlas')
+        os.makedirs(files_dir)
+        os.makedirs(atlas_dir)
+        _, files_time = timed(lambda: [img.save(os.path.join(files_dir, name), format='PNG')
+                                       for name, img in images.items()])
+        atlas = skill_composer.AtlasWriter(args.atlas_size)
+
+        def write_atlas():
+            for name, img in images.items():
+                atlas.add(os.path.join(atlas_dir, name), img)
+            return atlas.close()[atlas_dir]
+
+        (sheets, icons, sheet_bytes), atlas_time = timed(write_atlas)
+        result = {
+            "icons": len(images),
+            "atlas_size": args.atlas_size,
+            "files": len(os.listdir(files_dir)),
+            "files_bytes": folder_bytes(files_dir),
+            "files_seconds": round(files_time, 4),
+            "atlas_files": len(os.listdir(atlas_dir)),
+            "atlas_sheets": sheets,
+            "atlas_sheet_bytes": sheet_bytes,
+            "atlas_bytes": folder_bytes(atlas_dir),
+            "atlas_seconds": round(atlas_time, 4),
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    print(f"图标数量: {result['icons']}（图集边长不超过 {args.atlas_size}）")
+    print(f"单独文件: {result['files']} 个，{result['files_bytes'] / 1024:.1f} KB，编码 {result['files_seconds']:.3f}s")
+    print(f"图集: {result['atlas_sheets']} 张图集 + 索引共 {result['atlas_files']} 个文件，"
+          f"{result['atlas_bytes'] / 1024:.1f} KB（图集 {result['atlas_sheet_bytes'] / 1024:.1f} KB），"
+          f"编码 {result['atlas_seconds']:.3f}s")
+    return result
+
+
+def encode_profile(png, images):
+    """在当前线程中编码全部图片，返回 (编码结果, 线程 CPU 时间)；并行运行时各档位的耗时互不计入"""
+    start = time.thread_time()
+    data = [png.encode(img) for img in images]
+    return data, time.thread_time() - start
+
+
+def bench_png(args):
+    bases, skills = load_inputs(args)
+    jobs = make_jobs(bases, skills, args.images, seed=args.seed)
+    compositor = skill_composer.ScaledCompositor()
+    images = [compositor.composite(bases[b], skills[s], scale=args.scale, key=b) for b, s in jobs]
+
+    encoders = [skill_composer.PngEncoder(profile) for profile in ('fast', 'balanced', 'small')]
+    if args.colors:
+        encoders.append(skill_composer.PngEncoder('small', args.colors))
+    # 各档位在线程中并行编码（Pillow 编码时释放 GIL），单独计时
+    with ThreadPoolExecutor(max_workers=len(encoders)) as pool:
+        outcomes, wall_time = timed(lambda: list(pool.map(lambda png: encode_profile(png, images), encoders)))
+
+    result = {"images": len(images), "scale": args.scale, "wall_seconds": round(wall_time, 4), "profiles": {}}
+    print(f"图片数量: {len(images)}（{len(encoders)} 个档位并行编码，"
+          f"总耗时 {result['wall_seconds']:.3f}s）")
+    baseline = sum(len(data) for data in outcomes[1][0])
+    for png, (data, seconds) in zip(encoders, outcomes):
+        total = sum(len(item) for item in data)
+        deltas = [skill_composer.max_pixel_delta(img, Image.open(io.BytesIO(item)).convert(img.mode))
+                  for img, item in zip(images, data)]
+        result["profiles"][repr(png)] = {
+            "encode_seconds": round(seconds, 4),
+            "images_per_second": round(len(images) / seconds, 1) if seconds else None,
+            "bytes": total,
+            "bytes_vs_balanced": round(total / baseline, 3),
+            "max_pixel_delta": max(deltas),
+        }
+        print(f"{png!r}: 编码 {seconds:.3f}s，{total / 1024:.1f} KB"
+              f"（balanced 的 {total / baseline:.0%}），最大像素差异 {max(deltas)}")
+    return result
+
+
+def add_input_arguments(parser):
+    parser.add_argument('--base', default=None, help='底图文件夹，与 --skill 同时指定时使用真实素材，否则生成合成图片')
+    parser.add_argument('--skill', default=None, help='技能图片文件夹')
+    parser.add_argument('--images', type=int, default=200, help='合成的图片数量')
+    parser.add_argument('--scale', type=float, default=0.9, help='技能图片缩放比例')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="skill_composer.py 基准测试")
+    parser.add_argument('--json', default=None, help='把结果写入 JSON 文件')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('downscale', help='比较原流程与先缩放后合成的速度，并检查像素差异')
+    add_input_arguments(p)
+    p.add_argument('--max-delta', type=int, default=None, help='最大像素差异超过该值时以失败退出')
+    p.set_defaults(func=bench_downscale)
+    p = sub.add_parser('batch', help='比较原流程、ScaledCompositor 与 BatchCompositor 的吞吐量（需要 numpy）')
+    add_input_arguments(p)
+    p.add_argument('--batch', type=int, default=64, help='每批合成的任务数')
+    p.set_defaults(func=bench_batch)
+    p = sub.add_parser('atlas', help='比较单独 PNG 文件与图集输出的文件数、字节数与编码耗时')
+    add_input_arguments(p)
+    p.add_argument('--atlas-size', type=int, default=skill_composer.ATLAS_MAX_SIZE, help='图集最大边长')
+    p.set_defaults(func=bench_atlas)
+    p = sub.add_parser('png', help='并行比较各 PNG 编码档位的编码耗时、字节数与像素差异')
+    add_input_arguments(p)
+    p.add_argument('--colors', type=int, default=256, help='small 档位额外测试的调色板颜色数，0 表示不测试')
+    p.set_defaults(func=bench_png)
+    args = parser.parse_args()
+
+    result = args.func(args)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({args.command: result}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
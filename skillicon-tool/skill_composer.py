@@ -11,31 +11,107 @@
 - 支持配置文件指定技能与底图的对应关系
 """
 
+import io
 import os
+import math
 import json
+import hashlib
 import argparse
-from PIL import Image
+import contextlib
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageChops, features
 
+OUTPUT_SIZE = (204, 204)
 
-def load_images(folder_path, extensions=['.png', '.jpg', '.jpeg', '.bmp']):
-    """加载指定文件夹中的所有图片"""
-    images = []
-    for file_name in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, file_name)
-        if os.path.isfile(file_path):
-            _, ext = os.path.splitext(file_name.lower())
-            if ext in extensions:
-                try:
-                    img = Image.open(file_path)
-                    images.append((file_name, img))
-                    print(f"✓ 加载图片: {file_name}")
-                except Exception as e:
-                    print(f"✗ 加载失败: {file_name} - {e}")
-    return images
 
+IMAGE_CACHE_MB = 256
 
-def composite_images(base_img, skill_img, position='center', scale=1.0):
-    """将技能图片合成到底图上"""
+
+class ImageLibrary:
+    """按需解码的图片文件夹
+
+    扫描时只读取文件头（尺寸、模式、格式）并立即关闭文件；图片在第一次使用时才解码，
+    解码结果放入按字节预算淘汰的 LRU 缓存，被淘汰的图片会显式关闭。
+    支持 len()、in 与按文件名取图（images[name]），迭代得到文件名。
+    """
+
+    def __init__(self, folder_path, extensions=('.png', '.jpg', '.jpeg', '.bmp'), max_bytes=IMAGE_CACHE_MB * 2**20):
+        self.folder_path = folder_path
+        self.max_bytes = max_bytes
+        self.meta = {}
+        self.cache = OrderedDict()
+        self.cached_bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        for file_name in os.listdir(folder_path):
+            file_path = os.path.join(folder_path, file_name)
+            if os.path.isfile(file_path):
+                _, ext = os.path.splitext(file_name.lower())
+                if ext in extensions:
+                    try:
+                        with Image.open(file_path) as img:
+                            self.meta[file_name] = {'size': img.size, 'mode': img.mode, 'format': img.format}
+                        print(f"✓ 加载图片: {file_name}")
+                    except Exception as e:
+                        print(f"✗ 加载失败: {file_name} - {e}")
+
+    def __len__(self):
+        return len(self.meta)
+
+    def __contains__(self, name):
+        return name in self.meta
+
+    def __iter__(self):
+        return iter(self.meta)
+
+    def path(self, name):
+        return os.path.join(self.folder_path, name)
+
+    def image_bytes(self, name):
+        """按文件头估算解码后占用的字节数"""
+        meta = self.meta[name]
+        width, height = meta['size']
+        return width * height * Image.getmodebands(meta['mode'])
+
+    def __getitem__(self, name):
+        img = self.cache.get(name)
+        if img is not None:
+            self.cache.move_to_end(name)
+            self.hits += 1
+            return img
+        if name not in self.meta:
+            raise KeyError(name)
+        self.misses += 1
+        img = Image.open(self.path(name))
+        try:
+            img.load()
+        except Exception:
+            img.close()
+            raise
+        self.cache[name] = img
+        self.cached_bytes += self.image_bytes(name)
+        # 超出预算时淘汰最久未使用的图片，至少保留刚解码的这一张
+        while self.cached_bytes > self.max_bytes and len(self.cache) > 1:
+            old_name, old_img = self.cache.popitem(last=False)
+            self.cached_bytes -= self.image_bytes(old_name)
+            old_img.close()
+            self.evictions += 1
+        return img
+
+    def close(self):
+        for img in self.cache.values():
+            img.close()
+        self.cache.clear()
+        self.cached_bytes = 0
+
+
+def load_images(folder_path, extensions=['.png', '.jpg', '.jpeg', '.bmp'], max_bytes=IMAGE_CACHE_MB * 2**20):
+    """扫描指定文件夹中的所有图片，返回按需解码的 ImageLibrary"""
+    return ImageLibrary(folder_path, tuple(extensions), max_bytes)
+
+
+def composite_full(base_img, skill_img, position='center', scale=1.0):
+    """将技能图片合成到底图上，保持底图原尺寸"""
     # 确保技能图片有透明度通道
     if skill_img.mode != 'RGBA':
         skill_img = skill_img.convert('RGBA')
@@ -56,13 +132,306 @@ def composite_images(base_img, skill_img, position='center', scale=1.0):
     # 创建合成结果
     result = base_img.copy()
     result.paste(skill_img, (x, y), skill_img)
+    return result
+
+
+def composite_images(base_img, skill_img, position='center', scale=1.0):
+    """将技能图片合成到底图上"""
+    result = composite_full(base_img, skill_img, position=position, scale=scale)
     
     # 调整最终输出尺寸为204x204像素
-    result = result.resize((204, 204), Image.Resampling.LANCZOS)
+    result = result.resize(OUTPUT_SIZE, Image.Resampling.LANCZOS)
     
     return result
 
 
+def parse_sizes(spec):
+    """解析 --sizes，如 "204,128,64,@2x"：数字为边长，@Nx 为 204 的 N 倍；返回 [(名称, (宽, 高))]，按名称去重"""
+    sizes = []
+    for label in (part.strip() for part in spec.split(',')):
+        if not label:
+            continue
+        try:
+            if label.startswith('@') and label.endswith('x'):
+                factor = float(label[1:-1])
+                size = (round(OUTPUT_SIZE[0] * factor), round(OUTPUT_SIZE[1] * factor))
+            else:
+                size = (int(label), int(label))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"无法识别的尺寸: {label}")
+        if size[0] <= 0 or size[1] <= 0:
+            raise argparse.ArgumentTypeError(f"尺寸必须大于 0: {label}")
+        if label not in (name for name, _ in sizes):
+            sizes.append((label, size))
+    if not sizes:
+        raise argparse.ArgumentTypeError("至少需要一个尺寸")
+    return sizes
+
+
+def largest_size(sizes):
+    return max((size for _, size in sizes), key=lambda size: size[0] * size[1])
+
+
+def output_pyramid(source, sizes):
+    """由一张合成图生成 sizes 中的所有尺寸，返回 [(名称, 图片)]
+
+    不小于 204×204 的尺寸直接由 source 缩放，保证 204 的结果与单尺寸输出一致；
+    更小的尺寸由上一级（刚生成的较大尺寸）逐级缩小，避免每级都从全尺寸图缩放。
+    """
+    levels = []
+    previous = None
+    for label, size in sorted(sizes, key=lambda item: item[1][0] * item[1][1], reverse=True):
+        small = size[0] * size[1] < OUTPUT_SIZE[0] * OUTPUT_SIZE[1]
+        src = previous if small and previous is not None else source
+        img = src if src.size == size else src.resize(size, Image.Resampling.LANCZOS)
+        levels.append((label, img))
+        previous = img
+    return levels
+
+
+def size_output_path(output_path, label, size):
+    """204×204 写入输出文件夹本身，其余尺寸写入以尺寸名称命名的子文件夹"""
+    if size == OUTPUT_SIZE:
+        return output_path
+    folder, name = os.path.split(output_path)
+    return os.path.join(folder, label, name)
+
+
+# PNG 编码档位对应的 Image.save 参数
+PNG_PROFILES = {
+    'fast': {'compress_level': 1},
+    'balanced': {},  # Pillow 默认设置（compress_level 6）
+    'small': {'optimize': True},
+}
+
+
+class PngEncoder:
+    """按编码档位保存 PNG
+
+    fast 使用最低压缩级别，编码最快、文件较大；balanced 为 Pillow 默认设置，与不指定档位时的输出相同；
+    small 开启 optimize 以最小化文件。colors 大于 0 时（仅 small）先量化为不超过 colors 色的调色板图，
+    透明度随调色板保留；量化是有损的，有 libimagequant 时使用它，否则使用 Pillow 自带的八叉树量化。
+    """
+
+    def __init__(self, profile='balanced', colors=0):
+        if profile not in PNG_PROFILES:
+            raise ValueError(f"未知的 PNG 编码档位: {profile}")
+        if colors and profile != 'small':
+            raise ValueError("调色板量化只能用于 small 档位")
+        self.profile = profile
+        self.colors = colors
+
+    def __repr__(self):
+        return f"{self.profile}+{self.colors}色" if self.colors else self.profile
+
+    def prepare(self, img):
+        if not self.colors:
+            return img
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA')
+        method = Image.Quantize.LIBIMAGEQUANT if features.check('libimagequant') else Image.Quantize.FASTOCTREE
+        return img.quantize(self.colors, method=method)
+
+    def save(self, img, fp):
+        self.prepare(img).save(fp, format='PNG', **PNG_PROFILES[self.profile])
+
+    def encode(self, img):
+        buffer = io.BytesIO()
+        self.save(img, buffer)
+        return buffer.getvalue()
+
+
+def save_outputs(result, output_path, sizes=None, atlas=None, png=None):
+    """保存合成结果；给定 sizes 时 result 为合成原图，按 output_pyramid 生成并保存各个尺寸
+
+    给定 AtlasWriter 时不写单独的文件，图片交给图集打包。png 为 PngEncoder，默认使用 Pillow 的默认设置。
+    """
+    png = png or PngEncoder()
+    if not sizes:
+        outputs = [(output_path, result)]
+    else:
+        dims = dict(sizes)
+        outputs = [(size_output_path(output_path, label, dims[label]), img) for label, img in output_pyramid(result, sizes)]
+    for path, img in outputs:
+        if atlas:
+            atlas.add(path, img)
+        else:
+            png.save(img, path)
+
+
+ATLAS_MAX_SIZE = 2048
+
+
+def css_string(value):
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class AtlasWriter:
+    """把输出图标打包进少量图集大图，代替每个图标一个 PNG 文件
+
+    每个输出文件夹各自打包。图标按到达顺序以 first-fit 货架算法摆放：放入当前图集中第一个高度足够、
+    剩余宽度足够的货架，否则在下方新开一个货架；当前图集放不下时编码保存并开始下一张，
+    因此每张图集只编码一次，内存中同时只保留一张。close 时写入 atlas.json 与 atlas.css 坐标索引。
+    """
+
+    def __init__(self, max_size=ATLAS_MAX_SIZE, prefix='atlas', png=None):
+        self.max_size = max_size
+        self.prefix = prefix
+        self.png = png or PngEncoder()
+        self.folders = {}
+
+    def add(self, output_path, img):
+        folder, name = os.path.split(output_path)
+        if img.width > self.max_size or img.height > self.max_size:
+            raise ValueError(f"图片尺寸 {img.width}x{img.height} 超过图集尺寸 {self.max_size}")
+        state = self.folders.setdefault(folder, {'sheets': [], 'icons': {}, 'sheet': None})
+        sheet, x, y = self.place(folder, state, img.size)
+        sheet['image'].paste(img if img.mode == 'RGBA' else img.convert('RGBA'), (x, y))
+        sheet['width'] = max(sheet['width'], x + img.width)
+        state['icons'][name] = {'sheet': len(state['sheets']), 'x': x, 'y': y,
+                                'width': img.width, 'height': img.height}
+
+    def place(self, folder, state, size):
+        width, height = size
+        sheet = state['sheet']
+        if sheet is not None:
+            for shelf in sheet['shelves']:
+                # shelf 为 [y, 高度, 已用宽度]
+                if height <= shelf[1] and shelf[2] + width <= self.max_size:
+                    shelf[2] += width
+                    return sheet, shelf[2] - width, shelf[0]
+            if sheet['bottom'] + height <= self.max_size:
+                sheet['shelves'].append([sheet['bottom'], height, width])
+                sheet['bottom'] += height
+                return sheet, 0, sheet['bottom'] - height
+            self.flush(folder, state)
+        sheet = state['sheet'] = {
+            'image': Image.new('RGBA', (self.max_size, self.max_size), (0, 0, 0, 0)),
+            'shelves': [[0, height, width]], 'bottom': height, 'width': 0,
+        }
+        return sheet, 0, 0
+
+    def flush(self, folder, state):
+        """裁掉图集未使用的部分并保存"""
+        sheet = state['sheet']
+        file_name = f"{self.prefix}_{len(state['sheets'])}.png"
+        self.png.save(sheet['image'].crop((0, 0, sheet['width'], sheet['bottom'])), os.path.join(folder, file_name))
+        state['sheets'].append({'file': file_name, 'width': sheet['width'], 'height': sheet['bottom']})
+        state['sheet'] = None
+
+    def close(self):
+        """保存剩余图集并写入索引，返回 {文件夹: (图集数量, 图标数量, 图集总字节数)}"""
+        stats = {}
+        for folder, state in self.folders.items():
+            if state['sheet'] is not None:
+                self.flush(folder, state)
+            index = {'sheets': state['sheets'], 'icons': state['icons']}
+            with open(os.path.join(folder, f"{self.prefix}.json"), 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False, indent=2)
+            lines = [f".{self.prefix}-icon {{ display: inline-block; background-repeat: no-repeat; }}"]
+            for name, icon in state['icons'].items():
+                sheet = state['sheets'][icon['sheet']]
+                lines.append(
+                    f".{self.prefix}-icon[data-icon={css_string(os.path.splitext(name)[0])}] {{ "
+                    f"width: {icon['width']}px; height: {icon['height']}px; "
+                    f"background-image: url({css_string(sheet['file'])}); "
+                    f"background-position: {-icon['x']}px {-icon['y']}px; }}")
+            with open(os.path.join(folder, f"{self.prefix}.css"), 'w', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+            total = sum(os.path.getsize(os.path.join(folder, sheet['file'])) for sheet in state['sheets'])
+            stats[folder] = (len(state['sheets']), len(state['icons']), total)
+        self.folders = {}
+        return stats
+
+
+class ScaledCompositor:
+    """先缩放后合成：底图模板缩放到输出尺寸后缓存，技能图片一次缩放到它在输出图中的位置与大小
+
+    与 composite_images 相比省去每张图的全尺寸复制与全尺寸缩放，结果存在细微的重采样差异，
+    可用 max_pixel_delta 与 composite_images 的结果比较。
+    """
+
+    def __init__(self, size=OUTPUT_SIZE):
+        self.size = size
+        self.bases = {}
+
+    def scaled_base(self, base_img, key=None):
+        """返回缩放到输出尺寸的底图；key 默认为底图对象的 id，调用方需保证底图对象在使用期间不被释放"""
+        key = id(base_img) if key is None else key
+        scaled = self.bases.get(key)
+        if scaled is None:
+            scaled = self.bases[key] = base_img.resize(self.size, Image.Resampling.LANCZOS)
+        return scaled
+
+    def placement(self, base_size, skill_size, scale):
+        """计算技能图片在输出图中的整数像素范围 (x0, y0, x1, y1)、补边宽度与补边后技能图片中的浮点源区域
+
+        技能图片完全落在输出图之外时返回 None。
+        """
+        # 与 composite_images 相同的取整规则确定技能图片在底图上的位置
+        sw, sh = skill_size
+        if scale != 1.0:
+            sw, sh = int(sw * scale), int(sh * scale)
+        if sw <= 0 or sh <= 0:
+            raise ValueError("height and width must be > 0")
+        x, y = (base_size[0] - sw) // 2, (base_size[1] - sh) // 2
+
+        # 换算到输出坐标系，取覆盖该区域的整数像素范围
+        fx, fy = self.size[0] / base_size[0], self.size[1] / base_size[1]
+        left, top, right, bottom = x * fx, y * fy, (x + sw) * fx, (y + sh) * fy
+        x0, y0 = max(0, math.floor(left)), max(0, math.floor(top))
+        x1, y1 = min(self.size[0], math.ceil(right)), min(self.size[1], math.ceil(bottom))
+        if x1 <= x0 or y1 <= y0:
+            return None
+
+        # 对应的技能图片源区域可能超出边界，四周补透明像素后按浮点区域一次重采样
+        kx, ky = skill_size[0] / (right - left), skill_size[1] / (bottom - top)
+        pad = math.ceil(max(kx, ky)) * 3 + 1
+        box = ((x0 - left) * kx + pad, (y0 - top) * ky + pad, (x1 - left) * kx + pad, (y1 - top) * ky + pad)
+        return (x0, y0, x1, y1), pad, box
+
+    @staticmethod
+    def scaled_piece(skill_img, placement):
+        """按 placement 把 RGBA 技能图片重采样为输出图中对应区域大小的图片"""
+        (x0, y0, x1, y1), pad, box = placement
+        padded = Image.new('RGBA', (skill_img.width + 2 * pad, skill_img.height + 2 * pad), (0, 0, 0, 0))
+        padded.paste(skill_img, (pad, pad))
+        return padded.resize((x1 - x0, y1 - y0), Image.Resampling.LANCZOS, box=box)
+
+    def composite(self, base_img, skill_img, scale=1.0, key=None):
+        if base_img.mode not in ('RGB', 'RGBA'):
+            return composite_full(base_img, skill_img, scale=scale).resize(self.size, Image.Resampling.LANCZOS)
+        if skill_img.mode != 'RGBA':
+            skill_img = skill_img.convert('RGBA')
+
+        placement = self.placement(base_img.size, skill_img.size, scale)
+        result = self.scaled_base(base_img, key).copy()
+        if placement is None:
+            return result
+        region = placement[0]
+        x0, y0 = region[:2]
+        piece = self.scaled_piece(skill_img, placement)
+        base_alpha = result.getchannel('A').crop(region) if result.mode == 'RGBA' else None
+        result.paste(piece, (x0, y0), piece)
+        if base_alpha is not None:
+            # 原流程在全尺寸下按近似二值的透明度粘贴再缩小，透明度相当于 a + b - ab；
+            # 缩小后的边缘透明度是小数，直接用带蒙版的粘贴会使边缘透明度偏低
+            alpha = result.getchannel('A')
+            alpha.paste(ImageChops.screen(piece.getchannel('A'), base_alpha), region)
+            result.putalpha(alpha)
+        return result
+
+
+def max_pixel_delta(a, b):
+    """两张图片逐像素、逐通道的最大差值"""
+    if a.size != b.size or a.mode != b.mode:
+        raise ValueError(f"图片尺寸或模式不一致: {a.size} {a.mode} / {b.size} {b.mode}")
+    extrema = ImageChops.difference(a, b).getextrema()
+    if not isinstance(extrema[0], tuple):
+        extrema = (extrema,)
+    return max(high for _, high in extrema)
+
+
 def load_config(config_path):
     """加载配置文件"""
     if not os.path.exists(config_path):
@@ -82,149 +451,207 @@ def load_config(config_path):
         return None
 
 
-def extract_damage_type(character_name, skill_type=None, txt_folder='txt'):
-    """从角色的txt文件中提取指定技能类型的伤害类型"""
-    txt_path = os.path.join(txt_folder, f"{character_name}.txt")
-    
-    if not os.path.exists(txt_path):
-        print(f"⚠️ 未找到角色描述文件: {txt_path}")
-        return None
-    
-    # 尝试使用多种编码读取文件
-    encodings = ['utf-8', 'gbk', 'gb2312']
-    content = None
-    
-    for enc in encodings:
-        try:
-            with open(txt_path, 'r', encoding=enc) as f:
-                content = f.read()
-            break
-        except UnicodeDecodeError:
-            continue
-        except Exception as e:
-            print(f"✗ 使用{enc}编码读取{character_name}.txt失败: {e}")
-            continue
-    
-    if content is None:
-        print(f"⚠️ 无法读取文件: {txt_path} (尝试了编码: {', '.join(encodings)})")
-        return None
-    
-    def find_skill_damage_type(current_skill_type):
-        """根据技能类型查找对应章节并提取伤害类型"""
+CHARACTER_INDEX_PATH = os.path.join('.skill_cache', 'character_index.json')
+CHARACTER_INDEX_VERSION = 1
+TXT_ENCODINGS = ['utf-8', 'gbk', 'gb2312']
+DAMAGE_TYPES = ["寒冷伤害", "灼热伤害", "物理伤害", "电磁伤害", "自然伤害"]
+SKILL_ALIASES = {"普通攻击": "普", "战斗技能": "战", "连携技": "连", "终结技": "终"}
+FALLBACK_ORDER = {
+    "战": ["连", "终", "普"],
+    "连": ["战", "终", "普"],
+    "终": ["战", "连", "普"],
+    "普": ["战", "连", "终"],
+}
+# 章节提示中代替技能类型名称的占位符，查询时替换为调用方传入的名称
+SKILL_PLACEHOLDER = "\0"
+
+
+def canonical_skill_type(skill_type):
+    """把技能类型名称归一为 普/战/连/终，无法识别的按普通攻击处理"""
+    skill_type = SKILL_ALIASES.get(skill_type, skill_type)
+    return skill_type if skill_type in ("战", "连", "终") else "普"
+
+
+def parse_character_sections(content, character_name):
+    """把角色描述文本解析为 {技能类型: [伤害类型, 提示]}，技能类型为 普/战/连/终
+
+    未识别出伤害类型时伤害类型为 None，提示为原本会输出的警告信息。
+    """
+    def find_skill_damage_type(skill):
         # 查找战斗技能部分的起始位置
         combat_skills_start = content.find("【战斗技能 (Combat Skills)】")
         if combat_skills_start == -1:
             # 尝试查找不带英文的版本
             combat_skills_start = content.find("【战斗技能】")
             if combat_skills_start == -1:
-                print(f"⚠️ 未在{character_name}.txt中找到战斗技能部分")
-                return None
-        
-        # 根据技能类型定位对应的技能章节
-        skill_section_start = None
-        
-        if current_skill_type == "战" or current_skill_type == "战斗技能":
-            # 查找战技章节（第一个非普通攻击的战斗技能）
-            # 先找到普通攻击的位置
+                return None, f"⚠️ 未在{character_name}.txt中找到战斗技能部分"
+
+        if skill == "战":
+            # 战技为普通攻击之后的第一个技能
             normal_attack_start = content.find(">>> 【普通攻击】", combat_skills_start)
             if normal_attack_start == -1:
-                print(f"⚠️ 未在{character_name}.txt中找到普通攻击描述")
-                return None
-            
-            # 然后找到下一个技能，即战技
+                return None, f"⚠️ 未在{character_name}.txt中找到普通攻击描述"
             skill_section_start = content.find(">>> 【", normal_attack_start + 1)
             if skill_section_start == -1:
-                print(f"⚠️ 未在{character_name}.txt中找到战斗技能描述")
-                return None
-                
-        elif current_skill_type == "连" or current_skill_type == "连携技":
-            # 查找连携技章节
+                return None, f"⚠️ 未在{character_name}.txt中找到战斗技能描述"
+        elif skill == "连":
             skill_section_start = content.find("【连携技】")
             if skill_section_start == -1:
-                print(f"⚠️ 未在{character_name}.txt中找到连携技描述")
-                return None
-                
-        elif current_skill_type == "终" or current_skill_type == "终结技":
-            # 查找终结技章节
+                return None, f"⚠️ 未在{character_name}.txt中找到连携技描述"
+        elif skill == "终":
             skill_section_start = content.find("【终结技】")
             if skill_section_start == -1:
-                print(f"⚠️ 未在{character_name}.txt中找到终结技描述")
-                return None
-                
-        elif current_skill_type == "普" or current_skill_type == "普通攻击":
-            # 查找普通攻击章节
-            skill_section_start = content.find(">>> 【普通攻击】", combat_skills_start)
-            if skill_section_start == -1:
-                print(f"⚠️ 未在{character_name}.txt中找到普通攻击描述")
-                return None
-                
-        else:  # 默认提取普通攻击的伤害类型
+                return None, f"⚠️ 未在{character_name}.txt中找到终结技描述"
+        else:
             skill_section_start = content.find(">>> 【普通攻击】", combat_skills_start)
             if skill_section_start == -1:
-                print(f"⚠️ 未在{character_name}.txt中找到普通攻击描述")
-                return None
-        
+                return None, f"⚠️ 未在{character_name}.txt中找到普通攻击描述"
+
         # 查找描述文本
         description_start = content.find("描述:", skill_section_start)
         if description_start == -1:
-            print(f"⚠️ 未在{character_name}.txt中找到{current_skill_type}描述")
-            return None
-        
+            return None, f"⚠️ 未在{character_name}.txt中找到{SKILL_PLACEHOLDER}描述"
+
         # 提取描述文本直到下一个技能或章节
         next_section_start = content.find(">>> 【", description_start)
         if next_section_start == -1:
             # 如果没有下一个技能，查找下一个主要章节
             next_section_start = content.find("【", description_start + 1)
-            if next_section_start == -1:
-                description = content[description_start:]
-            else:
-                description = content[description_start:next_section_start]
-        else:
-            description = content[description_start:next_section_start]
-        
-        # 提取伤害类型
-        damage_types = ["寒冷伤害", "灼热伤害", "物理伤害", "电磁伤害", "自然伤害"]
-        for damage_type in damage_types:
+            if next_section_start == -1: next_section_start = len(content)
+        description = content[description_start:next_section_start]
+
+        for damage_type in DAMAGE_TYPES:
             if damage_type in description:
-                return damage_type
-        
-        print(f"⚠️ 未在{character_name}.txt中识别出{current_skill_type}的伤害类型")
+                return damage_type, None
+        return None, f"⚠️ 未在{character_name}.txt中识别出{SKILL_PLACEHOLDER}的伤害类型"
+
+    return {skill: list(find_skill_damage_type(skill)) for skill in ("普", "战", "连", "终")}
+
+
+class CharacterIndex:
+    """角色描述文件索引：每个 txt 只读取、解析一次，结果保存在内存中并持久化到 JSON 文件
+
+    持久化的条目按文件的修改时间与大小校验，文件变化后重新解析。
+    """
+
+    def __init__(self, txt_folder='txt', cache_path=CHARACTER_INDEX_PATH):
+        self.txt_folder = txt_folder
+        self.cache_path = cache_path
+        self.entries = {}
+        self.dirty = False
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == CHARACTER_INDEX_VERSION and data.get('txt_folder') == os.path.abspath(txt_folder):
+                    self.entries = data.get('characters', {})
+            except Exception as e:
+                print(f"⚠️ 角色索引读取失败，将重新解析: {e}")
+
+    def lookup(self, character_name):
+        """返回角色条目 {"messages": [...], "sections": {...} 或 None}；描述文件不存在时返回 None"""
+        txt_path = os.path.join(self.txt_folder, f"{character_name}.txt")
+        try:
+            st = os.stat(txt_path)
+        except OSError:
+            return None
+        entry = self.entries.get(character_name)
+        if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            return entry
+        entry = self.parse(character_name, txt_path)
+        entry['mtime_ns'], entry['size'] = st.st_mtime_ns, st.st_size
+        self.entries[character_name] = entry
+        self.dirty = True
+        return entry
+
+    @staticmethod
+    def parse(character_name, txt_path):
+        # 尝试使用多种编码读取文件
+        messages = []
+        content = None
+        for enc in TXT_ENCODINGS:
+            try:
+                with open(txt_path, 'r', encoding=enc) as f:
+                    content = f.read()
+                break
+            except UnicodeDecodeError:
+                continue
+            except Exception as e:
+                messages.append(f"✗ 使用{enc}编码读取{character_name}.txt失败: {e}")
+                continue
+        if content is None:
+            messages.append(f"⚠️ 无法读取文件: {txt_path} (尝试了编码: {', '.join(TXT_ENCODINGS)})")
+            return {'messages': messages, 'sections': None}
+        return {'messages': messages, 'sections': parse_character_sections(content, character_name)}
+
+    def save(self):
+        """有新解析的条目时写回索引文件"""
+        if not self.cache_path or not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': CHARACTER_INDEX_VERSION, 'txt_folder': os.path.abspath(self.txt_folder),
+                           'characters': self.entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+            self.dirty = False
+        except Exception as e:
+            print(f"⚠️ 角色索引保存失败: {e}")
+
+
+# 未显式传入索引时按 txt 文件夹复用的内存索引
+_character_indexes = {}
+
+
+def extract_damage_type(character_name, skill_type=None, txt_folder='txt', index=None):
+    """从角色的txt文件中提取指定技能类型的伤害类型
+
+    index 为 CharacterIndex；未指定时使用该文件夹的内存索引（不持久化）。
+    """
+    if index is None:
+        index = _character_indexes.get(txt_folder)
+        if index is None:
+            index = _character_indexes[txt_folder] = CharacterIndex(txt_folder, cache_path=None)
+
+    entry = index.lookup(character_name)
+    if entry is None:
+        print(f"⚠️ 未找到角色描述文件: {os.path.join(txt_folder, f'{character_name}.txt')}")
         return None
-    
+    for message in entry['messages']:
+        print(message)
+    sections = entry['sections']
+    if sections is None:
+        return None
+
+    def find_skill_damage_type(current_skill_type):
+        damage_type, warning = sections[canonical_skill_type(current_skill_type)]
+        if warning:
+            print(warning.replace(SKILL_PLACEHOLDER, str(current_skill_type)))
+        return damage_type
+
     try:
         # 尝试查找指定技能类型的伤害类型
         if skill_type:
             damage_type = find_skill_damage_type(skill_type)
             if damage_type:
                 return damage_type
-        
+
         # 回退机制：尝试其他技能类型
-        fallback_order = []
-        
-        if skill_type == "战":
-            fallback_order = ["连", "终", "普"]
-        elif skill_type == "连":
-            fallback_order = ["战", "终", "普"]
-        elif skill_type == "终":
-            fallback_order = ["战", "连", "普"]
-        elif skill_type == "普":
-            fallback_order = ["战", "连", "终"]
-        else:
-            # 默认回退顺序
-            fallback_order = ["战", "连", "终", "普"]
-        
+        fallback_order = FALLBACK_ORDER.get(skill_type, ["战", "连", "终", "普"])
+
         print(f"🔄 尝试从其他技能类型获取{character_name}的伤害类型作为回退")
-        
+
         for fallback_skill in fallback_order:
             print(f"   尝试{fallback_skill}技能...")
             damage_type = find_skill_damage_type(fallback_skill)
             if damage_type:
                 print(f"✅ 回退成功：使用{fallback_skill}技能的{damage_type}")
                 return damage_type
-        
+
         print(f"❌ 所有回退尝试失败，无法获取{character_name}的伤害类型")
         return None
-        
+
     except Exception as e:
         print(f"✗ 提取{character_name}的伤害类型失败: {e}")
         return None
@@ -248,14 +675,293 @@ def get_template_mapping(custom_mapping=None):
     return default_mapping
 
 
-def process_images(base_folder, skill_folder, output_folder, scale=1.0, config=None, custom_mapping=None):
-    """批量处理图片合成"""
+def save_composite(base_img, skill_img, scale, output_path, compositor=None, base_name=None, sizes=None,
+                   atlas=None, png=None):
+    """合成并保存单张图片；给定 ScaledCompositor 时使用先缩放后合成的流程
+
+    给定 sizes 时只合成一次，由同一张合成图生成并保存各个尺寸（见 output_pyramid）。
+    """
+    if compositor:
+        result = compositor.composite(base_img, skill_img, scale=scale, key=base_name)
+    elif sizes:
+        result = composite_full(base_img, skill_img, scale=scale)
+    else:
+        result = composite_images(base_img, skill_img, scale=scale)
+    save_outputs(result, output_path, sizes, atlas, png)
+
+
+# 进程池中每个进程各自缓存已解码的底图
+_worker_folders = None
+_worker_bases = {}
+_worker_compositor = None
+_worker_sizes = None
+_worker_png = None
+
+
+def _init_composite_worker(base_folder, skill_folder, output_folder, fast=False, sizes=None, png=None):
+    global _worker_folders, _worker_compositor, _worker_sizes, _worker_png
+    _worker_folders = (base_folder, skill_folder, output_folder)
+    _worker_bases.clear()
+    _worker_compositor = ScaledCompositor(largest_size(sizes) if sizes else OUTPUT_SIZE) if fast else None
+    _worker_sizes = sizes
+    _worker_png = png
+
+
+def _composite_job(base_name, skill_name, scale, output_name):
+    """在进程池中执行一个合成任务，成功返回 None，失败返回错误信息"""
+    base_folder, skill_folder, output_folder = _worker_folders
+    try:
+        base_img = _worker_bases.get(base_name)
+        if base_img is None:
+            base_img = Image.open(os.path.join(base_folder, base_name))
+            base_img.load()
+            _worker_bases[base_name] = base_img
+        with Image.open(os.path.join(skill_folder, skill_name)) as skill_img:
+            save_composite(base_img, skill_img, scale, os.path.join(output_folder, output_name),
+                           _worker_compositor, base_name, _worker_sizes, png=_worker_png)
+    except Exception as e:
+        return str(e)
+    return None
+
+
+MANIFEST_NAME = '.skill_manifest.json'
+MANIFEST_VERSION = 1
+
+
+class BuildManifest:
+    """增量构建清单：记录每个输出文件由哪些输入生成，保存在输出文件夹的 .skill_manifest.json 中
+
+    任务键由底图与技能图片的文件内容哈希、缩放比例、输出尺寸、伤害类型、合成流程与 PNG 编码档位计算，
+    键未变化且输出文件都还在时跳过该任务。输入文件的哈希按修改时间与大小缓存，未变化的文件不再重新读取。
+    close 时删除清单中本次运行没有再生成的输出（孤立文件）；只会删除清单记录过的文件。
+    """
+
+    def __init__(self, output_folder, path=None):
+        self.output_folder = output_folder
+        self.path = path or os.path.join(output_folder, MANIFEST_NAME)
+        self.inputs = {}
+        self.outputs = {}
+        self.seen = set()
+        self.built = self.skipped = self.removed = 0
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == MANIFEST_VERSION:
+                    self.inputs = data.get('inputs', {})
+                    self.outputs = data.get('outputs', {})
+            except Exception as e:
+                print(f"⚠️ 增量清单读取失败，将重新生成全部图片: {e}")
+
+    def file_hash(self, path):
+        st = os.stat(path)
+        key = os.path.abspath(path)
+        entry = self.inputs.get(key)
+        if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            return entry['sha256']
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        self.inputs[key] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'sha256': digest.hexdigest()}
+        return digest.hexdigest()
+
+    def job_key(self, base_path, skill_path, scale, sizes=None, damage_type=None, mode='default', png=None):
+        png = png or PngEncoder()
+        parts = [self.file_hash(base_path), self.file_hash(skill_path), scale,
+                 [list(size) for _, size in sizes] if sizes else list(OUTPUT_SIZE), damage_type, mode,
+                 png.profile, png.colors]
+        return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def fresh(self, output_name, key, files):
+        """键未变化且 files（相对输出文件夹的路径）都存在时返回 True"""
+        self.seen.add(output_name)
+        entry = self.outputs.get(output_name)
+        if not entry or entry['key'] != key or entry['files'] != files:
+            return False
+        if not all(os.path.exists(os.path.join(self.output_folder, name)) for name in files):
+            return False
+        self.skipped += 1
+        return True
+
+    def record(self, output_name, key, files):
+        """记录成功生成的输出；上次生成、这次不再生成的文件（如去掉的尺寸）随即删除"""
+        entry = self.outputs.get(output_name)
+        if entry:
+            self.remove(set(entry['files']) - set(files))
+        self.outputs[output_name] = {'key': key, 'files': files}
+        self.built += 1
+
+    def remove(self, files):
+        for name in files:
+            try:
+                os.remove(os.path.join(self.output_folder, name))
+                self.removed += 1
+            except FileNotFoundError:
+                pass
+            # 尺寸子文件夹清空后一并删除
+            folder = os.path.dirname(name)
+            if folder:
+                try:
+                    os.rmdir(os.path.join(self.output_folder, folder))
+                except OSError:
+                    pass
+
+    def close(self):
+        """清理孤立的输出并保存清单"""
+        for output_name in [name for name in self.outputs if name not in self.seen]:
+            self.remove(self.outputs.pop(output_name)['files'])
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': MANIFEST_VERSION, 'inputs': self.inputs, 'outputs': self.outputs},
+                          f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"⚠️ 增量清单保存失败: {e}")
+
+
+class CompositeRunner:
+    """执行合成任务：jobs 为 1 时在当前进程逐个合成，否则分发到进程池
+
+    并行时每条任务相关的日志先缓存，按提交顺序与合成结果一起打印，输出与逐个处理时一致。
+    给定 BuildManifest 时跳过输入未变化的任务。
+    """
+
+    def __init__(self, base_folder, skill_folder, output_folder, base_dict, skill_dict, jobs=1, fast=False,
+                 sizes=None, atlas=None, manifest=None, png=None):
+        self.base_folder = base_folder
+        self.skill_folder = skill_folder
+        self.output_folder = output_folder
+        self.atlas = atlas
+        self.manifest = manifest
+        self.png = png
+        self.mode = 'fast' if fast else 'default'
+        self.base_dict = base_dict
+        self.skill_dict = skill_dict
+        self.sizes = sizes
+        # 多尺寸输出时先缩放后合成的流程直接合成最大的尺寸
+        size = largest_size(sizes) if sizes else OUTPUT_SIZE
+        self.compositor = ScaledCompositor(size) if fast else None
+        self.pool = None
+        if jobs > 1:
+            self.pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_composite_worker,
+                                            initargs=(base_folder, skill_folder, output_folder, fast, sizes, png))
+        self.pending = deque()
+        self.max_pending = jobs * 4
+
+    @contextlib.contextmanager
+    def capture(self):
+        """并行时缓存这段代码的输出，留待按顺序打印"""
+        if not self.pool:
+            yield
+            return
+        buffer = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(buffer):
+                yield
+        finally:
+            if buffer.getvalue():
+                self.pending.append((buffer.getvalue(), None, None, None, None))
+
+    def log(self, message):
+        if not self.pool:
+            print(message)
+        else:
+            self.pending.append((message + "\n", None, None, None, None))
+
+    def output_files(self, output_name):
+        """一个任务生成的所有文件，相对输出文件夹的路径"""
+        if not self.sizes:
+            return [output_name]
+        return [size_output_path(output_name, label, size) for label, size in self.sizes]
+
+    def submit(self, base_name, skill_name, scale, success, failure, damage_type=None):
+        """success 中的 {output_name} 与 failure 中的 {error} 在输出时替换"""
+        base_name_no_ext, _ = os.path.splitext(base_name)
+        skill_name_no_ext, _ = os.path.splitext(skill_name)
+        output_name = f"{base_name_no_ext}_{skill_name_no_ext}.png"
+        success = success.replace("{output_name}", output_name)
+        record = None
+        if self.manifest:
+            files = self.output_files(output_name)
+            try:
+                key = self.manifest.job_key(os.path.join(self.base_folder, base_name),
+                                            os.path.join(self.skill_folder, skill_name),
+                                            scale, self.sizes, damage_type, self.mode, self.png)
+            except OSError:
+                # 输入文件读取失败时照常合成，由合成过程报告错误
+                key = None
+            if key and self.manifest.fresh(output_name, key, files):
+                self.log(f"{success}（未变化，已跳过）")
+                return
+            self.manifest.seen.add(output_name)
+            record = (output_name, key, files) if key else None
+        if not self.pool:
+            try:
+                save_composite(self.base_dict[base_name], self.skill_dict[skill_name], scale,
+                               os.path.join(self.output_folder, output_name), self.compositor, base_name,
+                               self.sizes, self.atlas, self.png)
+                print(success)
+                if record:
+                    self.manifest.record(*record)
+            except Exception as e:
+                print(failure.replace("{error}", str(e)))
+            return
+        future = self.pool.submit(_composite_job, base_name, skill_name, scale, output_name)
+        self.pending.append(("", future, success, failure, record))
+        self.drain()
+
+    def drain(self, wait=False):
+        """按顺序打印已完成的任务；等待中的任务过多或 wait 为 True 时阻塞等待"""
+        while self.pending:
+            text, future, success, failure, record = self.pending[0]
+            if future is not None and not future.done() and not wait and len(self.pending) <= self.max_pending:
+                break
+            self.pending.popleft()
+            if text:
+                print(text, end='')
+            if future is not None:
+                error = future.result()
+                print(success if error is None else failure.replace("{error}", error))
+                if error is None and record:
+                    self.manifest.record(*record)
+
+    def close(self):
+        if self.pool:
+            try:
+                self.drain(wait=True)
+            finally:
+                self.pool.shutdown()
+
+
+def process_images(base_folder, skill_folder, output_folder, scale=1.0, config=None, custom_mapping=None,
+                   txt_folder='txt', index_path=CHARACTER_INDEX_PATH, jobs=1, fast=False, cache_mb=IMAGE_CACHE_MB,
+                   sizes=None, atlas_size=0, incremental=False, png=None):
+    """批量处理图片合成
+
+    index_path 为角色索引的持久化路径，为 None 时只在内存中缓存解析结果。
+    jobs 大于 1 时使用进程池并行合成与保存，日志仍按原顺序输出。
+    fast 为 True 时使用 ScaledCompositor 先缩放后合成。
+    cache_mb 为解码后图片缓存的内存预算（MB）。
+    sizes 为 parse_sizes 的结果，给定时每个任务只合成一次并输出所有尺寸。
+    atlas_size 大于 0 时不写单独的图片，改为打包成边长不超过 atlas_size 的图集（见 AtlasWriter）。
+    incremental 为 True 时按输出文件夹中的 BuildManifest 跳过输入未变化的任务，并清理孤立的输出。
+    png 为 PngEncoder，决定输出图片与图集的 PNG 编码档位。
+    """
+    if atlas_size and jobs > 1:
+        raise ValueError("图集输出需要在当前进程中收集图片，不能与多进程合成同时使用")
+    if atlas_size and incremental:
+        raise ValueError("图集每次都会整体重新生成，不能与增量构建同时使用")
     # 确保输出文件夹存在
     os.makedirs(output_folder, exist_ok=True)
+    for label, size in sizes or []:
+        if size != OUTPUT_SIZE:
+            os.makedirs(os.path.join(output_folder, label), exist_ok=True)
     
-    # 加载所有底图和技能图片
-    base_images = load_images(base_folder)
-    skill_images = load_images(skill_folder)
+    # 扫描所有底图和技能图片，图片在使用时才解码
+    base_images = load_images(base_folder, max_bytes=cache_mb * 2**20)
+    skill_images = load_images(skill_folder, max_bytes=cache_mb * 2**20)
     
     if not base_images:
         print("⚠️ 未找到底图，请确保base文件夹中有图片")
@@ -269,11 +975,13 @@ def process_images(base_folder, skill_folder, output_folder, scale=1.0, config=N
     print(f"底图数量: {len(base_images)}")
     print(f"技能图片数量: {len(skill_images)}")
     
-    # 将图片列表转换为字典，便于查找
-    base_dict = {name: img for name, img in base_images}
-    skill_dict = {name: img for name, img in skill_images}
+    base_dict = base_images
+    skill_dict = skill_images
     
     # 处理合成任务
+    runner = CompositeRunner(base_folder, skill_folder, output_folder, base_dict, skill_dict, jobs=jobs, fast=fast,
+                             sizes=sizes, atlas=AtlasWriter(atlas_size, png=png) if atlas_size else None,
+                             manifest=BuildManifest(output_folder) if incremental else None, png=png)
     if config and 'combinations' in config:
         # 使用配置文件中的组合
         combinations = config['combinations']
@@ -281,7 +989,7 @@ def process_images(base_folder, skill_folder, output_folder, scale=1.0, config=N
         
         for i, combo in enumerate(combinations, 1):
             if 'base' not in combo or 'skill' not in combo:
-                print(f"✗ 组合 #{i} 缺少必要参数 'base' 或 'skill'")
+                runner.log(f"✗ 组合 #{i} 缺少必要参数 'base' 或 'skill'")
                 continue
             
             base_name = combo['base']
@@ -290,86 +998,78 @@ def process_images(base_folder, skill_folder, output_folder, scale=1.0, config=N
             
             # 检查底图和技能图片是否存在
             if base_name not in base_dict:
-                print(f"✗ 组合 #{i} 底图不存在: {base_name}")
+                runner.log(f"✗ 组合 #{i} 底图不存在: {base_name}")
                 continue
             if skill_name not in skill_dict:
-                print(f"✗ 组合 #{i} 技能图片不存在: {skill_name}")
+                runner.log(f"✗ 组合 #{i} 技能图片不存在: {skill_name}")
                 continue
             
-            try:
-                # 合成图片
-                result = composite_images(base_dict[base_name], skill_dict[skill_name], scale=combo_scale)
-                
-                # 生成输出文件名
-                base_name_no_ext, _ = os.path.splitext(base_name)
-                skill_name_no_ext, _ = os.path.splitext(skill_name)
-                output_name = f"{base_name_no_ext}_{skill_name_no_ext}.png"
-                output_path = os.path.join(output_folder, output_name)
-                
-                # 保存结果
-                result.save(output_path, format='PNG')
-                print(f"✓ 组合 #{i}: {output_name}")
-                
-            except Exception as e:
-                print(f"✗ 组合 #{i} 合成失败: {base_name} + {skill_name} - {e}")
+            runner.submit(base_name, skill_name, combo_scale,
+                          success=f"✓ 组合 #{i}: {{output_name}}",
+                          failure=f"✗ 组合 #{i} 合成失败: {base_name} + {skill_name} - {{error}}")
     else:
         # 自动匹配模式：根据角色技能属性匹配底图
         print(f"\n📋 使用自动匹配模式")
         template_mapping = get_template_mapping(custom_mapping)
+        character_index = CharacterIndex(txt_folder, cache_path=index_path)
         count = 0
         total = len(skill_images)
         
-        for skill_name, skill_img in skill_images:
+        for skill_name in skill_images:
             count += 1
-            try:
-                # 从技能图片文件名中提取角色名和技能类型（格式：角色名-类型.png）
-                if '-' in skill_name:
-                    character_name = skill_name.split('-')[0]
-                    # 提取技能类型（战、连、普、终等）
-                    skill_type = skill_name.split('-')[1].split('.')[0]
-                else:
-                    print(f"⚠️ 无法从{skill_name}中提取角色名和技能类型")
-                    continue
-                
-                # 提取角色的伤害类型
-                damage_type = extract_damage_type(character_name, skill_type)
-                if not damage_type:
-                    continue
-                
-                # 匹配底图模板
-                if damage_type not in template_mapping:
-                    print(f"⚠️ 未知的伤害类型: {damage_type}")
-                    continue
-                
-                # 对于终结技，使用带-终后缀的模板
-                base_name = template_mapping[damage_type]
-                if skill_type == "终":
-                    # 构建终结技模板名称
-                    base_name_no_ext, ext = os.path.splitext(base_name)
-                    ultimate_base_name = f"{base_name_no_ext}-终{ext}"
-                    if ultimate_base_name in base_dict:
-                        base_name = ultimate_base_name
-                        print(f"🔄 终结技使用专用模板: {base_name}")
-                
-                if base_name not in base_dict:
-                    print(f"⚠️ 未找到对应的底图模板: {base_name}")
+            # 并行时先缓存匹配阶段的输出，与合成结果一起按顺序打印
+            with runner.capture():
+                try:
+                    # 从技能图片文件名中提取角色名和技能类型（格式：角色名-类型.png）
+                    if '-' in skill_name:
+                        character_name = skill_name.split('-')[0]
+                        # 提取技能类型（战、连、普、终等）
+                        skill_type = skill_name.split('-')[1].split('.')[0]
+                    else:
+                        print(f"⚠️ 无法从{skill_name}中提取角色名和技能类型")
+                        continue
+                    
+                    # 提取角色的伤害类型
+                    damage_type = extract_damage_type(character_name, skill_type, txt_folder, index=character_index)
+                    if not damage_type:
+                        continue
+                    
+                    # 匹配底图模板
+                    if damage_type not in template_mapping:
+                        print(f"⚠️ 未知的伤害类型: {damage_type}")
+                        continue
+                    
+                    # 对于终结技，使用带-终后缀的模板
+                    base_name = template_mapping[damage_type]
+                    if skill_type == "终":
+                        # 构建终结技模板名称
+                        base_name_no_ext, ext = os.path.splitext(base_name)
+                        ultimate_base_name = f"{base_name_no_ext}-终{ext}"
+                        if ultimate_base_name in base_dict:
+                            base_name = ultimate_base_name
+                            print(f"🔄 终结技使用专用模板: {base_name}")
+                    
+                    if base_name not in base_dict:
+                        print(f"⚠️ 未找到对应的底图模板: {base_name}")
+                        continue
+                except Exception as e:
+                    print(f"✗ ({count}/{total}) {skill_name} - {e}")
                     continue
-                
-                # 合成图片
-                result = composite_images(base_dict[base_name], skill_img, scale=scale)
-                
-                # 生成输出文件名
-                base_name_no_ext, _ = os.path.splitext(base_name)
-                skill_name_no_ext, _ = os.path.splitext(skill_name)
-                output_name = f"{base_name_no_ext}_{skill_name_no_ext}.png"
-                output_path = os.path.join(output_folder, output_name)
-                
-                # 保存结果
-                result.save(output_path, format='PNG')
-                print(f"✓ ({count}/{total}) {output_name} (自动匹配: {damage_type} → {base_name})")
-                
-            except Exception as e:
-                print(f"✗ ({count}/{total}) {skill_name} - {e}")
+            
+            runner.submit(base_name, skill_name, scale,
+                          success=f"✓ ({count}/{total}) {{output_name}} (自动匹配: {damage_type} → {base_name})",
+                          failure=f"✗ ({count}/{total}) {skill_name} - {{error}}", damage_type=damage_type)
+        character_index.save()
+    runner.close()
+    if runner.atlas:
+        for folder, (sheets, icons, total) in runner.atlas.close().items():
+            print(f"🗂️ 图集: {folder} - {icons} 个图标打包为 {sheets} 张图集，共 {total / 1024:.1f} KB")
+    if runner.manifest:
+        runner.manifest.close()
+        manifest = runner.manifest
+        print(f"📋 增量构建: 生成 {manifest.built} 个，跳过 {manifest.skipped} 个未变化的任务，清理 {manifest.removed} 个旧文件")
+    base_images.close()
+    skill_images.close()
     
     print(f"\n✅ 所有合成任务完成！")
     print(f"输出文件夹: {output_folder}")
@@ -385,9 +1085,31 @@ def main():
     parser.add_argument('--scale', '-sc', type=float, default=0.9, help='技能图片缩放比例（最小0.8）')
     parser.add_argument('--config', '-c', default=None, help='配置文件路径（JSON格式）')
     parser.add_argument('--mapping', '-m', default=None, help='底图属性映射配置文件路径（JSON格式）')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='并行合成的进程数')
+    parser.add_argument('--fast', action='store_true', help='先缩放后合成：缓存缩放后的底图，技能图片一次缩放到目标尺寸')
+    parser.add_argument('--sizes', type=parse_sizes, default=None,
+                        help='输出多个尺寸，逗号分隔，如 204,128,64,@2x（@2x 为 408）；非 204 的尺寸写入同名子文件夹')
+    parser.add_argument('--atlas', nargs='?', type=int, const=ATLAS_MAX_SIZE, default=0, metavar='SIZE',
+                        help=f'把输出打包为图集（边长不超过 SIZE，默认 {ATLAS_MAX_SIZE}），并写入 atlas.json 与 atlas.css 索引；不能与 --jobs 同时使用')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量构建：跳过输入未变化的任务，并删除本次不再生成的旧输出（不能与 --atlas 同时使用）')
+    parser.add_argument('--png-profile', choices=sorted(PNG_PROFILES), default='balanced',
+                        help='PNG 编码档位：fast 编码最快，balanced 为默认设置，small 文件最小')
+    parser.add_argument('--png-colors', type=int, default=0, metavar='N',
+                        help='small 档位下先量化为不超过 N 色（2-256）的调色板图，保留透明度（有损）')
+    parser.add_argument('--cache-mb', type=int, default=IMAGE_CACHE_MB, help='解码后图片缓存的内存预算（MB）')
+    parser.add_argument('--no-index-cache', action='store_true', help='不读取也不保存角色描述索引缓存')
     parser.add_argument('--test', '-t', action='store_true', help='创建测试数据并运行测试')
     
     args = parser.parse_args()
+    if args.atlas and args.jobs > 1:
+        parser.error("--atlas 不能与 --jobs 同时使用")
+    if args.atlas and args.incremental:
+        parser.error("--atlas 不能与 --incremental 同时使用")
+    if args.png_colors and args.png_profile != 'small':
+        parser.error("--png-colors 只能与 --png-profile small 同时使用")
+    if args.png_colors and not 2 <= args.png_colors <= 256:
+        parser.error("--png-colors 的取值范围为 2-256")
     
     # 验证缩放比例
     if args.scale < 0.8:
@@ -405,6 +1127,10 @@ def main():
     print(f"技能图片文件夹: {args.skill}")
     print(f"输出文件夹: {args.output}")
     print(f"技能图片缩放比例: {args.scale}")
+    if args.sizes:
+        print(f"输出尺寸: {', '.join(f'{label}({w}x{h})' for label, (w, h) in args.sizes)}")
+    if args.png_profile != 'balanced':
+        print(f"PNG 编码档位: {PngEncoder(args.png_profile, args.png_colors)!r}")
     
     # 加载配置文件
     config = None
@@ -424,7 +1150,11 @@ def main():
     print("=" * 50)
     
     # 执行合成任务
-    process_images(args.base, args.skill, args.output, scale=args.scale, config=config, custom_mapping=custom_mapping)
+    process_images(args.base, args.skill, args.output, scale=args.scale, config=config, custom_mapping=custom_mapping,
+                   index_path=None if args.no_index_cache else CHARACTER_INDEX_PATH, jobs=max(1, args.jobs),
+                   fast=args.fast, cache_mb=args.cache_mb, sizes=args.sizes,
+                   atlas_size=max(0, args.atlas), incremental=args.incremental,
+                   png=PngEncoder(args.png_profile, args.png_colors))
 
 
 if __name__ == "__main__":